@@ -0,0 +1,61 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from apps.api.serializers import AuthorModelSerializer
+from apps.api.values import ValuesSerializer
+from apps.db_train_alternative.models import Author
+
+
+class Command(BaseCommand):
+    help = "Замер времени на строку списка авторов API: AuthorModelSerializer и быстрый путь " \
+           "ValuesSerializer (apps/api/values.py), с проверкой одинакового JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Строк в списке (как page_size)")
+        parser.add_argument("--repeat", type=int, default=20, help="Число замеров, берётся лучший")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with transaction.atomic():
+            # Недостающие авторы создаются временно и удаляются откатом транзакции
+            missing = rows - Author.objects.count()
+            if missing > 0:
+                Author.objects.bulk_create([Author(name=f"Автор {i}", email=f"benchmark{i}@example.com")
+                                            for i in range(missing)])
+            queryset = Author.objects.order_by("pk")[:rows]
+            fast = ValuesSerializer(AuthorModelSerializer)
+            renderer = JSONRenderer()
+
+            if renderer.render(AuthorModelSerializer(queryset, many=True).data) != \
+                    renderer.render(fast.to_representation(fast.values(queryset))):
+                raise CommandError("Ответы сериализаторов различаются")
+
+            # Уже загруженные строки - время только сериализации, без запроса
+            instances, values = list(queryset), list(fast.values(queryset))
+            repeat = options["repeat"]
+            results = {
+                "с запросом к БД": (
+                    self.measure(lambda: AuthorModelSerializer(queryset, many=True).data, repeat),
+                    self.measure(lambda: fast.to_representation(fast.values(queryset)), repeat)),
+                "только сериализация": (
+                    self.measure(lambda: AuthorModelSerializer(instances, many=True).data, repeat),
+                    self.measure(lambda: fast.to_representation(values), repeat)),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Строк: {rows}, замеров: {repeat}, мкс на строку (AuthorModelSerializer / ValuesSerializer)")
+        for name, (slow, quick) in results.items():
+            self.stdout.write(f"{name:>20}: {slow * 1e6 / rows:>7.2f} / {quick * 1e6 / rows:>5.2f}, "
+                              f"ускорение {slow / quick:.1f}x")
+
+    @staticmethod
+    def measure(func, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = perf_counter()
+            func()
+            best = min(best, perf_counter() - start)
+        return best
@@ -0,0 +1,87 @@
+"""
+Запросы к БД для представлений API авторов.
+
+Расширенное представление автора (AuthorExtendedSerializer, ?extended=true)
+показывает профиль, число статей и заголовки последних статей. Чтобы оно не
+делало запросов на каждого автора (N+1), всё нужное загружается вместе со
+списком: каждое представление объявляет требования к запросу по действиям
+(list, retrieve) в extended_queryset, например
+
+    extended_queryset = {
+        'list': AUTHOR_LIST,
+        'retrieve': AUTHOR_DETAIL,
+    }
+
+QueryRequirements.apply() добавляет к запросу select_related (профиль - JOIN),
+annotate (число статей - COUNT в том же запросе) и prefetch_related (последние
+статьи - один запрос на всю страницу, срез по каждому автору через оконную
+функцию в БД). Число запросов не зависит от размера страницы.
+"""
+
+from typing import NamedTuple
+
+from django.db.models import Count, Prefetch
+
+from apps.db_train_alternative.models import Entry
+
+EXTENDED_PARAM = 'extended'  # ?extended=true - расширенное представление
+
+
+class QueryRequirements(NamedTuple):
+    select_related: tuple = ()
+    prefetch_related: tuple = ()
+    annotate: dict = None  # None - без аннотаций (изменяемый {} по умолчанию был бы общим для всех экземпляров)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.annotate:
+            queryset = queryset.annotate(**self.annotate)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+
+def recent_entries(count):
+    """Последние count статей автора (по дате публикации) в атрибут recent_entries"""
+    return Prefetch('entries', to_attr='recent_entries',
+                    queryset=Entry.objects.only('id', 'author_id', 'headline').order_by('-pub_date', '-id')[:count])
+
+
+AUTHOR_LIST = QueryRequirements(select_related=('authorprofile',),
+                                prefetch_related=(recent_entries(3),),
+                                annotate={'entries_count': Count('entries')})
+AUTHOR_DETAIL = AUTHOR_LIST._replace(prefetch_related=(recent_entries(10),))
+
+
+def is_extended(request):
+    return request.query_params.get(EXTENDED_PARAM) == 'true'
+
+
+class ExtendedRepresentationMixin:
+    """
+    Расширенное представление для действий из extended_queryset (только чтение):
+    сериализатор extended_serializer_class и запрос с требованиями действия.
+    Для остальных действий и без ?extended=true всё как раньше.
+    """
+    extended_serializer_class = None
+    extended_queryset = {}
+
+    def get_action(self):
+        # У ViewSet действие задаёт роутер, у GenericAPIView - наличие pk в URL
+        return getattr(self, 'action', None) or ('retrieve' if self.kwargs.get(self.lookup_field) else 'list')
+
+    def use_extended(self):
+        return (self.request.method == 'GET' and is_extended(self.request)
+                and self.get_action() in self.extended_queryset)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.use_extended():
+            queryset = self.extended_queryset[self.get_action()].apply(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.use_extended():
+            return self.extended_serializer_class
+        return super().get_serializer_class()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from apps.db_train_alternative.models import Author
+from apps.db_train_alternative.models import Author, AuthorProfile
 
 
 class AuthorSerializer(serializers.Serializer):
@@ -27,3 +27,24 @@ class AuthorModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ['id', 'name', 'email']  # или можно прописать '__all__'
+
+
+class AuthorProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuthorProfile
+        fields = ['bio', 'phone_number', 'city']
+
+
+class AuthorExtendedSerializer(serializers.ModelSerializer):
+    """
+    Автор с профилем, числом статей и заголовками последних статей (только чтение).
+    Данные берутся из запроса представления (QueryRequirements в querysets.py):
+    профиль - select_related, entries_count - annotate, recent_entries - Prefetch.
+    """
+    profile = AuthorProfileSerializer(source='authorprofile', read_only=True, default=None)
+    entries_count = serializers.IntegerField(read_only=True)
+    recent_entries = serializers.SlugRelatedField(many=True, read_only=True, slug_field='headline')
+
+    class Meta:
+        model = Author
+        fields = ['id', 'name', 'email', 'profile', 'entries_count', 'recent_entries']
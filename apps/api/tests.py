@@ -2,8 +2,19 @@ from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from apps.db_train_alternative.models import Author
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.db_train_alternative.models import Author, AuthorProfile, Blog, Entry
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 from .serializers import AuthorModelSerializer
+from .values import ValuesSerializer
+from .views import AuthorViewSet
+from django.contrib.auth.models import User
+from project.budgets import BudgetTestMixin
 
 
 class AuthorViewSetTestCase(APITestCase):
@@ -93,3 +104,155 @@ class AuthorViewSetTestCase(APITestCase):
         print(f"Ответ от сервера: {response.status_code}")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Author.objects.filter(pk=self.author1.pk).exists())  # Проверка, что теперь этого автора не существует
+
+
+class PerformanceBudgetTestCase(BudgetTestMixin, APITestCase):
+    """Число запросов и p95 времени ответа API авторов (project/budgets.py) на большом наборе данных"""
+    AUTHORS = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password="password")
+        Author.objects.bulk_create([Author(name=f"Автор {i}", email=f"author{i}@example.com")
+                                    for i in range(cls.AUTHORS)])
+        cls.author = Author.objects.first()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_author_api_view(self):
+        self.assertWithinBudget('author-list')
+        self.assertWithinBudget('author-detail', kwargs={'pk': self.author.pk})
+
+    def test_author_generic_view(self):
+        self.assertWithinBudget('author-generic-list')
+        self.assertWithinBudget('author-generic-detail', kwargs={'pk': self.author.pk})
+
+    def test_author_viewset(self):
+        self.assertWithinBudget('authors-viewset-list')
+        self.assertWithinBudget('authors-viewset-list', data={'page': 100, 'ordering': 'email'})
+        self.assertWithinBudget('authors-viewset-detail', kwargs={'pk': self.author.pk})
+
+
+class AuthorExtendedRepresentationTestCase(APITestCase):
+    """Расширенное представление авторов (?extended=true) без N+1: число запросов не зависит от размера страницы"""
+    AUTHORS = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password="password")
+        authors = Author.objects.bulk_create([Author(name=f"Автор {i}", email=f"author{i}@example.com")
+                                              for i in range(cls.AUTHORS)])
+        AuthorProfile.objects.bulk_create([AuthorProfile(author=author, city=f"Город {i}")
+                                           for i, author in enumerate(authors) if i % 2])
+        blog = Blog.objects.create(name="Блог", tagline="Слоган")
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        Entry.objects.bulk_create([Entry(blog=blog, author=author, headline=f"Статья {j} автора {i}", body_text="",
+                                         pub_date=start + timedelta(days=j))
+                                   for i, author in enumerate(authors) for j in range(i % 15)])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, name, data=None, kwargs=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, kwargs=kwargs), {"extended": "true", **(data or {})})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response.json()
+
+    def test_constant_queries(self):
+        for name, page_sizes, expected in (("authors-viewset-list", (1, 5, 40), 3),
+                                           ("author-generic-list", (None,), 2),
+                                           ("author-list", (None,), 2)):
+            counts = {self.count_queries(name, {"page_size": size} if size else None)[0] for size in page_sizes}
+            self.assertEqual(counts, {expected}, name)
+        # Без пагинации число запросов не зависит от числа авторов
+        Author.objects.bulk_create([Author(name=f"Новый {i}", email=f"new{i}@example.com") for i in range(20)])
+        self.assertEqual(self.count_queries("author-list")[0], 2)
+
+        for name in ("authors-viewset-detail", "author-generic-detail", "author-detail"):
+            self.assertEqual(self.count_queries(name, kwargs={"pk": Author.objects.first().pk})[0], 2, name)
+
+    def test_representation(self):
+        _, data = self.count_queries("authors-viewset-list", {"page_size": self.AUTHORS})
+        for item in data["results"]:
+            author = Author.objects.get(pk=item["id"])
+            entries = list(author.entries.order_by("-pub_date").values_list("headline", flat=True))
+            self.assertEqual(item["entries_count"], len(entries))
+            self.assertEqual(item["recent_entries"], entries[:3])
+            profile = AuthorProfile.objects.filter(author=author).values("bio", "phone_number", "city").first()
+            self.assertEqual(item["profile"], profile)
+
+        author = Author.objects.get(name="Автор 14")
+        _, item = self.count_queries("author-detail", kwargs={"pk": author.pk})
+        self.assertEqual(item["recent_entries"], [f"Статья {j} автора 14" for j in range(13, 3, -1)])
+        self.assertIsNone(item["profile"])  # Профили только у авторов с нечётным номером
+
+        # Без параметра - прежнее представление
+        response = self.client.get(reverse("authors-viewset-list"))
+        self.assertEqual(response.data["results"], AuthorModelSerializer(Author.objects.all()[:5], many=True).data)
+
+
+class ValuesSerializerTestCase(APITestCase):
+    """Быстрый путь списка авторов (values.py) отдаёт тот же JSON, что AuthorModelSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="reader", password="password")
+        Author.objects.bulk_create([Author(name=f"Автор «{i}» \"{i % 7}\"", email=f"author{i}@example.com")
+                                    for i in range(1200)])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get_content(self, data):
+        """Результаты и число объектов в JSON (ссылки пагинации содержат параметры запроса)"""
+        response = self.client.get(reverse("authors-viewset-list"), data)
+        return JSONRenderer().render({key: response.data[key] for key in ("count", "results")})
+
+    def test_same_output(self):
+        for data in ({"page_size": 1000}, {"page_size": 1000, "page": 2, "ordering": "-email"},
+                     {"search": "author11"}, {"name": "«5»"}, {}):
+            with mock.patch.object(AuthorModelSerializer, "to_representation") as slow:
+                fast_content = self.get_content({**data, "fast": "true"})
+            slow.assert_not_called()
+            self.assertEqual(fast_content, self.get_content(data), data)
+
+        # Расширенное представление и одиночный автор - через обычные сериализаторы
+        self.assertIn(b"entries_count", self.get_content({"extended": "true", "fast": "true"}))
+        author = Author.objects.first()
+        response = self.client.get(reverse("authors-viewset-detail", kwargs={"pk": author.pk}))
+        self.assertEqual(response.data, AuthorModelSerializer(author).data)
+
+    def test_model_serializer_by_default(self):
+        # Без ?fast=true список отдаёт ModelSerializer по объектам моделей
+        with mock.patch.object(AuthorViewSet.values_serializer, "to_representation") as fast:
+            response = self.client.get(reverse("authors-viewset-list"), {"page_size": 10})
+        fast.assert_not_called()
+        self.assertEqual(response.data["results"],
+                         AuthorModelSerializer(Author.objects.all()[:10], many=True).data)
+
+    def test_converted_fields(self):
+        class EntrySerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Entry
+                fields = ["id", "headline", "pub_date", "mod_date", "rating", "number_of_comments"]
+
+        blog = Blog.objects.create(name="Блог", tagline="Слоган")
+        Entry.objects.bulk_create([Entry(blog=blog, author=Author.objects.first(), headline=f"Статья {i}",
+                                         body_text="", rating=i / 3,
+                                         pub_date=datetime(2024, 1, 1, 12, i, tzinfo=timezone.utc))
+                                   for i in range(10)])
+        fast = ValuesSerializer(EntrySerializer)
+        self.assertFalse(fast.plain)
+        queryset = Entry.objects.order_by("pk")
+        self.assertEqual(JSONRenderer().render(fast.to_representation(fast.values(queryset))),
+                         JSONRenderer().render(EntrySerializer(queryset, many=True).data))
+
+        class EntryWithBlogSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Entry
+                fields = ["id", "blog"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(EntryWithBlogSerializer)
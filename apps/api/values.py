@@ -0,0 +1,103 @@
+"""
+Быстрое чтение больших списков без создания объектов моделей.
+
+ModelSerializer на каждую строку создаёт объект модели и для каждого поля
+вызывает get_attribute и to_representation - при странице в 1000 авторов это
+основное время ответа. ValuesSerializer для ModelSerializer с простыми полями
+модели (без связей и методов):
+    - один раз при создании разбирает поля сериализатора: ключ ответа, столбец
+      модели и преобразование значения (для полей, где значение из БД уже
+      совпадает с представлением DRF - int, str, - преобразования нет);
+    - читает строки кортежами (values_list) и собирает из них словари.
+Ответ совпадает с ответом исходного сериализатора байт в байт (проверяется в
+тестах, замер - python manage.py benchmark_serializers).
+
+ValuesListMixin включает быстрый путь в действии list представления только по
+явному запросу клиента (?fast=true), если задан values_serializer и запрос
+обслуживает тот же сериализатор (например, не ?extended=true). По умолчанию
+список отдаёт обычный ModelSerializer: быстрый путь не знает о
+SerializerMethodField и других полях, которым нужен объект модели, и
+сериализатор представления может со временем их получить. Время
+to_representation профилирование запросов учитывает как время сериализации.
+"""
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from project.profiling import timed
+
+FAST_PARAM = 'fast'  # ?fast=true - список через values_serializer
+
+# Поля, значение которых из БД уже совпадает с представлением DRF (поле сериализатора, поля модели)
+IDENTITY = [
+    (serializers.IntegerField, ('AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField',
+                                'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField')),
+    (serializers.CharField, ('CharField', 'EmailField', 'SlugField', 'TextField', 'URLField')),
+]
+
+
+def is_identity(field, model_field):
+    return any(isinstance(field, field_class) and model_field.get_internal_type() in internal_types
+               for field_class, internal_types in IDENTITY)
+
+
+class ValuesSerializer:
+    """Представление списка строк values_list по полям ModelSerializer serializer_class"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        model = serializer_class.Meta.model
+        keys, columns, converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None or model_field.is_relation:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: поддерживаются только простые "
+                                           f"поля модели {model.__name__}")
+            keys.append(name)
+            columns.append(model_field.attname)
+            converters.append(None if is_identity(field, model_field) else field.to_representation)
+        self.keys, self.columns, self.converters = tuple(keys), tuple(columns), tuple(converters)
+        self.plain = not any(converters)
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    @timed("serializer")  # Учитывается профилированием как время сериализации DRF (project/profiling.py)
+    def to_representation(self, rows):
+        keys = self.keys
+        if self.plain:
+            return [dict(zip(keys, row)) for row in rows]
+        converters = self.converters
+        # None не преобразуется, как в Serializer.to_representation
+        return [{key: value if convert is None or value is None else convert(value)
+                 for key, convert, value in zip(keys, converters, row)}
+                for row in rows]
+
+
+def is_fast(request):
+    return request.query_params.get(FAST_PARAM) == 'true'
+
+
+class ValuesListMixin:
+    """Действие list через values_serializer по ?fast=true (если сериализатор запроса - его serializer_class)"""
+    values_serializer = None
+
+    def use_values_serializer(self):
+        return (self.values_serializer is not None and is_fast(self.request)
+                and getattr(self, 'action', None) == 'list'
+                and self.get_serializer_class() is self.values_serializer.serializer_class)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_serializer():
+            return super().list(request, *args, **kwargs)
+        queryset = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.to_representation(page))
+        return Response(self.values_serializer.to_representation(queryset))
@@ -6,7 +6,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt  # Чтобы post, put, patch, delete не требовали csrf токена (небезопасно)
 from apps.db_train_alternative.models import Author
-from .serializers import AuthorSerializer, AuthorModelSerializer
+from .serializers import AuthorSerializer, AuthorModelSerializer, AuthorExtendedSerializer
+from .querysets import AUTHOR_LIST, AUTHOR_DETAIL, ExtendedRepresentationMixin, is_extended
+from .values import ValuesSerializer, ValuesListMixin
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
@@ -15,26 +17,39 @@ from rest_framework import filters
 from rest_framework import permissions
 from rest_framework import authentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from project.db_routing import use_replica
 
 
 class AuthorAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    # Требования к запросу расширенного представления (?extended=true) по действиям (querysets.py)
+    extended_queryset = {
+        'list': AUTHOR_LIST,
+        'retrieve': AUTHOR_DETAIL,
+    }
 
     @csrf_exempt
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
     def get(self, request, pk=None):
+        extended = is_extended(request)
+        serializer_class = AuthorExtendedSerializer if extended else AuthorSerializer
         if pk is not None:
+            queryset = Author.objects.all()
+            if extended:
+                queryset = self.extended_queryset['retrieve'].apply(queryset)
             try:
-                author = Author.objects.get(pk=pk)
-                serializer = AuthorSerializer(author)
+                author = queryset.get(pk=pk)
+                serializer = serializer_class(author)
                 return Response(serializer.data)
             except Author.DoesNotExist:
                 return Response({"message": "Автор не найден"}, status=status.HTTP_404_NOT_FOUND)
         else:
             authors = Author.objects.all()
-            serializer = AuthorSerializer(authors, many=True)
+            if extended:
+                authors = self.extended_queryset['list'].apply(authors)
+            serializer = serializer_class(authors, many=True)
             return Response(serializer.data)
 
     def post(self, request):
@@ -100,10 +115,16 @@ class CustomPermission(permissions.BasePermission):
         return False
 
 
-class AuthorGenericAPIView(GenericAPIView, RetrieveModelMixin, ListModelMixin, CreateModelMixin, UpdateModelMixin,
-                           DestroyModelMixin):
+class AuthorGenericAPIView(ExtendedRepresentationMixin, GenericAPIView, RetrieveModelMixin, ListModelMixin,
+                           CreateModelMixin, UpdateModelMixin, DestroyModelMixin):
     queryset = Author.objects.all()
     serializer_class = AuthorModelSerializer
+    extended_serializer_class = AuthorExtendedSerializer
+    # Требования к запросу расширенного представления (?extended=true) по действиям (querysets.py)
+    extended_queryset = {
+        'list': AUTHOR_LIST,
+        'retrieve': AUTHOR_DETAIL,
+    }
 
     # Переопределяем атрибут permission_classes для указания нашего собственного разрешения
     # permission_classes = [CustomPermission]
@@ -140,9 +161,16 @@ class AuthorPagination(PageNumberPagination):
     max_page_size = 1000  # максимальное количество объектов на странице
 
 
-class AuthorViewSet(ModelViewSet):
+class AuthorViewSet(ExtendedRepresentationMixin, ValuesListMixin, ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorModelSerializer
+    values_serializer = ValuesSerializer(AuthorModelSerializer)  # ?fast=true - список без объектов моделей (values.py)
+    extended_serializer_class = AuthorExtendedSerializer
+    # Требования к запросу расширенного представления (?extended=true) по действиям (querysets.py)
+    extended_queryset = {
+        'list': AUTHOR_LIST,
+        'retrieve': AUTHOR_DETAIL,
+    }
     pagination_class = AuthorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['name', 'email']  # Указываем для каких полем можем проводить фильтрацию
@@ -158,6 +186,11 @@ class AuthorViewSet(ModelViewSet):
             queryset = queryset.filter(name__contains=name)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Список читается из реплики БД, если они настроены (project/db_routing.py)
+        with use_replica():
+            return super().list(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'])
     def my_action(self, request, pk=None):
         # Ваша пользовательская логика здесь
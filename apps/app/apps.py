@@ -5,3 +5,7 @@ class DbConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.app'
     # verbose_name = "Приложение"  # Чтобы изменить название при отображении в админ панели (другой вариант приведен в admin.py)
+
+    def ready(self):
+        from . import signals  # Подключение обработчиков сигналов (счётчики комментариев)
+        from . import checks  # Проверки настроек (python manage.py check)
@@ -0,0 +1,105 @@
+"""
+Кеширование в приложении app:
+    1. данные боковой панели (sidebar) блога: список блогов, облако тегов
+       главной страницы и теги конкретного блога;
+    2. готовые страницы для анонимных пользователей (см. mixins.AnonymousPageCacheMixin).
+
+Ключи кеша версионные: к каждому ключу добавляется текущая версия.
+При изменении моделей (сигналы в signals.py) версия меняется, и все старые
+ключи перестают использоваться сразу, без перебора и удаления (устаревшие
+значения вытесняются бэкендом по таймауту).
+
+Кеши заполняются чтением из основной БД (project/db_routing.use_primary),
+даже на страницах, читающих из реплик: иначе сразу после смены версии под
+новым ключом сохранились бы данные отставшей реплики.
+
+Версия страниц - это ещё и ETag/Last-Modified ответов, поэтому ключ версии
+хранится без срока жизни и должен быть общим для всех процессов сервера:
+при ANONYMOUS_PAGE_CACHE=true нужен общий кеш (CACHE_BACKEND=file), с
+LocMemCache (по умолчанию, у каждого процесса свой) не проходит проверка
+app.E001 (checks.py).
+"""
+
+from hashlib import md5
+from time import time_ns
+
+from django.core.cache import cache
+
+from project.db_routing import use_primary
+
+from .models import Blog, Tag
+
+SIDEBAR_VERSION_KEY = "sidebar:version"
+SIDEBAR_TIMEOUT = 60 * 60  # Время жизни фрагмента, с (на случай изменения данных в обход сигналов)
+TAG_CLOUD_SIZE = 10  # Количество тегов в облаке тегов на главной
+
+PAGES_VERSION_KEY = "pages:version"
+PAGES_TIMEOUT = 5 * 60  # Время жизни сохранённых страниц, с (версия страниц хранится бессрочно)
+
+
+def get_sidebar_version():
+    # Начальное значение - текущее время, чтобы после вытеснения ключа версии
+    # из кеша не вернуться к старому номеру версии и старым фрагментам
+    return cache.get_or_set(SIDEBAR_VERSION_KEY, time_ns, timeout=None)
+
+
+def invalidate_sidebar():
+    """Переход на новую версию ключей (вызывается из обработчиков сигналов)"""
+    try:
+        cache.incr(SIDEBAR_VERSION_KEY)
+    except ValueError:  # Ключа версии нет в кеше - следующее чтение создаст новую версию
+        pass
+
+
+def cached_fragment(name, compute):
+    """Значение фрагмента name из кеша, при промахе вычисляется compute() и сохраняется"""
+    key = f"sidebar:{get_sidebar_version()}:{name}"
+
+    def compute_from_primary():
+        with use_primary():
+            return compute()
+
+    return cache.get_or_set(key, compute_from_primary, timeout=SIDEBAR_TIMEOUT)
+
+
+def get_blogs():
+    """Список блогов (словари id, name, slug_name)"""
+    return cached_fragment("blogs", lambda: list(Blog.objects.values("id", "name", "slug_name")))
+
+
+def get_tag_cloud():
+    """Облако тегов главной страницы (словари id, name, slug_name)"""
+    return cached_fragment("tags", lambda: list(Tag.objects.values("id", "name", "slug_name")[:TAG_CLOUD_SIZE]))
+
+
+def get_blog_tags(blog_id):
+    """Теги статей блога (словари id, name, slug_name)"""
+    return cached_fragment(f"blog_tags:{blog_id}",
+                           lambda: list(Tag.objects.filter(entry__blog=blog_id)
+                                        .values("id", "name", "slug_name").distinct()))
+
+
+def get_pages_version():
+    """
+    Версия страниц - время последнего изменения контента в наносекундах.
+    Используется и как ETag, и как Last-Modified страниц.
+    """
+    return cache.get_or_set(PAGES_VERSION_KEY, time_ns, timeout=None)
+
+
+def invalidate_pages():
+    """Новая версия страниц со временем изменения (вызывается из обработчиков сигналов)"""
+    cache.set(PAGES_VERSION_KEY, time_ns(), timeout=None)
+
+
+def get_page(version, path):
+    return cache.get(page_key(version, path))
+
+
+def set_page(version, path, response):
+    cache.set(page_key(version, path), response, timeout=PAGES_TIMEOUT)
+
+
+def page_key(version, path):
+    # Путь вместе с параметрами запроса (?page=, ?cursor=) хешируется, чтобы ключ был ограниченной длины
+    return f"pages:{version}:{md5(path.encode()).hexdigest()}"
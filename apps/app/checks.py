@@ -0,0 +1,24 @@
+"""
+Проверки настроек приложения app (python manage.py check). Подключаются в DbConfig.ready() (apps.py).
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Бэкенды, у которых кеш свой в каждом процессе сервера
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_page_cache_backend(app_configs, **kwargs):
+    # Версия страниц (cache.py) - это ETag/Last-Modified: у всех процессов она должна быть одной
+    if settings.ANONYMOUS_PAGE_CACHE and settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Error(
+            "ANONYMOUS_PAGE_CACHE требует общего для процессов сервера кеша",
+            hint="Включите CACHE_BACKEND=file в .env (см. apps/app/cache.py)",
+            id="app.E001",
+        )]
+    return []
@@ -0,0 +1,62 @@
+"""
+Денормализованные счётчики комментариев:
+    Entry.number_of_comments - число комментариев к статье;
+    Comment.number_of_replies - число прямых ответов на комментарий.
+
+При создании и удалении комментария счётчики меняются атомарным
+UPDATE ... SET counter = counter ± 1 (через F()), без чтения значения в Python,
+поэтому параллельные запросы не теряют изменения. При удалении ветки комментариев
+счётчик статьи пересчитывается одним агрегирующим запросом, а счётчики ответов,
+удаляемых тем же каскадом, не обновляются. Обработчики сигналов - в signals.py.
+
+Если данные менялись в обход сигналов (bulk_create, raw SQL, loaddata), счётчики
+пересчитываются командой `python manage.py recount_comments`.
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Entry, Comment
+
+
+def change_comment_counters(comment, delta):
+    """Изменение счётчиков статьи и родительского комментария на delta"""
+    if comment.entry_id is not None:
+        Entry.objects.filter(pk=comment.entry_id).update(number_of_comments=F("number_of_comments") + delta)
+    if comment.parent_id is not None:
+        Comment.objects.filter(pk=comment.parent_id).update(number_of_replies=F("number_of_replies") + delta)
+
+
+def thread_deleted(root):
+    """
+    Счётчики после удаления ветки с корнем root (вместе со всеми ответами): у
+    родителя корня - на 1 меньше, у статьи - пересчёт одним агрегирующим запросом
+    """
+    if root.parent_id is not None:
+        Comment.objects.filter(pk=root.parent_id).update(number_of_replies=F("number_of_replies") - 1)
+    if root.entry_id is not None:
+        Entry.objects.filter(pk=root.entry_id).update(number_of_comments=count_subquery(Comment, "entry"))
+
+
+def count_subquery(model, field):
+    """Коррелированный подзапрос: число строк model, у которых field ссылается на текущую строку (0, если нет)"""
+    counts = (model.objects.filter(**{field: OuterRef("pk")})
+              .order_by()
+              .values(field)
+              .annotate(count=Count("pk"))
+              .values("count"))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def recount_comment_counters(entry_model=Entry, comment_model=Comment, using=DEFAULT_DB_ALIAS):
+    """
+    Полный пересчёт счётчиков: по одному UPDATE с агрегирующим подзапросом на
+    каждую таблицу, независимо от числа строк. Возвращает число обновлённых
+    статей и комментариев.
+    Модели можно передать явно (например, исторические модели из миграции),
+    using - псевдоним БД.
+    """
+    entries = entry_model.objects.using(using).update(number_of_comments=count_subquery(comment_model, "entry"))
+    comments = comment_model.objects.using(using).update(number_of_replies=count_subquery(comment_model, "parent"))
+    return entries, comments
@@ -0,0 +1,50 @@
+"""
+Хранилище учётных данных созданных пользователей (users.jsonl) для скриптов
+заполнения БД.
+
+Формат JSON Lines: одна строка - один пользователь {"username", "email", "password"}.
+    - Запись только дозаписью в конец файла: стоимость записи зависит от размера
+      новой пачки, а не от размера уже накопленного файла.
+    - На время записи файл блокируется (django.core.files.locks, как в
+      FileSystemStorage), пачка пишется одним вызовом write, поэтому
+      параллельные запуски (потоки, процессы) не перетирают и не перемешивают
+      строки друг друга.
+    - Чтение построчное, без загрузки всего файла в память.
+"""
+
+import json
+import os
+
+from django.core.files import locks
+
+USERS_FILE = "users.jsonl"
+
+
+def append_users(users, path=USERS_FILE):
+    """Дозапись пользователей в конец файла под блокировкой"""
+    lines = "".join(json.dumps(user, ensure_ascii=False) + "\n" for user in users)
+    if not lines:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        locks.lock(f, locks.LOCK_EX)
+        try:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            locks.unlock(f)
+
+
+def read_users(path=USERS_FILE):
+    """
+    Генератор пользователей из файла. Читатель не блокирует файл: строки
+    дописываются целиком, а пустые и повреждённые (прерванная запись) строки пропускаются.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
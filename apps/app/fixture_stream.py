@@ -0,0 +1,243 @@
+"""
+Потоковые выгрузка и загрузка фикстур в формате dumpdata/loaddata (JSON-массив
+объектов {"model", "pk", "fields"}) для дампов любого размера.
+
+loaddata и dumpdata держат в памяти весь документ, а loaddata ещё и сохраняет
+объекты по одному через save() с сигналами. Здесь:
+    - JSON читается частями (iter_json_array): в памяти только текущий объект
+      и не больше batch_size объектов каждой модели;
+    - объекты копятся по моделям и записываются bulk_create пачками (при
+      совпадении pk запись обновляется, как в loaddata), строки промежуточных
+      таблиц многие-ко-многим - тоже пачками;
+    - вся загрузка идёт в одной транзакции, проверка внешних ключей отложена до
+      конца загрузки (как в loaddata), поэтому порядок моделей в файле не важен;
+      оставшиеся пачки записываются в порядке зависимостей моделей;
+    - выгрузка идёт по моделям итератором по pk, связи многие-ко-многим
+      читаются одним запросом на пачку, а не на каждый объект.
+
+Сигналы при загрузке не вызываются, поэтому import_fixture сам делает то, что
+делают их обработчики: после загрузки статей или комментариев пересчитывает
+счётчики комментариев (counters.py), а после записи сбрасывает кеши sidebar и
+страниц (как BulkLoader).
+"""
+
+import json
+from itertools import islice
+
+from django.apps import apps
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.color import no_style
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+from .cache import invalidate_sidebar, invalidate_pages
+from .counters import recount_comment_counters
+from .models import Entry, Comment
+
+BATCH_SIZE = 1000
+READ_SIZE = 64 * 1024  # Размер блока чтения файла, символов
+DEFAULT_APP_LABELS = ("app", "db_train", "db_train_alternative")
+
+
+def iter_json_array(file, read_size=READ_SIZE):
+    """
+    Генератор элементов JSON-массива верхнего уровня из файла, без загрузки
+    всего документа в память.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Ожидался JSON-массив")
+    pos += 1
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Неожиданный конец файла")
+        if buffer[pos] == "]":
+            return
+        if not first:
+            if buffer[pos] != ",":
+                raise ValueError(f"Ожидалась ',' вместо {buffer[pos]!r}")
+            pos += 1
+            skip_whitespace()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:  # Значение могло оборваться на границе блока
+                fill()
+                continue
+            break
+        pos = end
+        first = False
+        yield item
+
+
+class _ChunkSerializer(PythonSerializer):
+    """Сериализатор dumpdata, берущий связи многие-ко-многим из заранее загруженного словаря"""
+
+    def __init__(self, m2m):
+        super().__init__()
+        self.m2m = m2m  # {имя поля: {pk объекта: [pk связанных]}}
+
+    def handle_m2m_field(self, obj, field):
+        if field.remote_field.through._meta.auto_created:
+            self._current[field.name] = self.m2m[field.name].get(obj.pk, [])
+
+
+def _m2m_fields(model):
+    return [field for field in model._meta.many_to_many if field.remote_field.through._meta.auto_created]
+
+
+def _load_m2m(model, pks, using):
+    """Связи многие-ко-многим пачки объектов - один запрос на поле"""
+    result = {}
+    for field in _m2m_fields(model):
+        through = field.remote_field.through
+        source, target = f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+        links = {}
+        rows = through._default_manager.using(using).filter(**{f"{source}__in": pks}).order_by("pk")
+        for source_id, target_id in rows.values_list(source, target):
+            links.setdefault(source_id, []).append(target_id)
+        result[field.name] = links
+    return result
+
+
+def get_models(labels=DEFAULT_APP_LABELS):
+    """Модели по меткам вида 'app' или 'app.entry' в порядке зависимостей"""
+    app_list = {}
+    for label in labels:
+        if "." in label:
+            model = apps.get_model(label)
+            app_list.setdefault(model._meta.app_config, []).append(model)
+        else:
+            app_list[apps.get_app_config(label)] = None
+    models = serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+    return [model for model in models if model._meta.managed and not model._meta.proxy]
+
+
+def export_fixture(stream, labels=DEFAULT_APP_LABELS, batch_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS, progress=None):
+    """
+    Выгрузка объектов моделей labels в stream в формате dumpdata --indent 4.
+    progress(label, count) вызывается после каждой пачки. Возвращает число объектов.
+    """
+    total = 0
+    first = True
+    stream.write("[")
+    for model in get_models(labels):
+        objects = model._base_manager.using(using).order_by(model._meta.pk.name).iterator(chunk_size=batch_size)
+        count = 0
+        while chunk := list(islice(objects, batch_size)):
+            serializer = _ChunkSerializer(_load_m2m(model, [obj.pk for obj in chunk], using))
+            for data in serializer.serialize(chunk):
+                stream.write("\n" if first else ",\n")
+                stream.write(json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4))
+                first = False
+            count += len(chunk)
+            if progress:
+                progress(model._meta.label_lower, count)
+        total += count
+    stream.write("\n]\n")
+    return total
+
+
+class _ModelBuffer:
+    """Объекты одной модели и их связи многие-ко-многим, ожидающие записи"""
+
+    def __init__(self, model):
+        self.model = model
+        self.objects = []
+        self.m2m = []  # (имя поля, pk объекта, [pk связанных])
+        self.loaded = 0
+
+
+def import_fixture(stream, batch_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS, progress=None):
+    """
+    Загрузка фикстуры из stream. progress(label, count) вызывается после записи
+    каждой пачки. Возвращает {метка модели: число объектов}.
+    """
+    connection = connections[using]
+    buffers = {}
+
+    def flush(buffer):
+        if not buffer.objects:
+            return
+        model = buffer.model
+        update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+        options = {"ignore_conflicts": True}
+        if update_fields:  # При совпадении pk запись перезаписывается, как в loaddata
+            options = {"update_conflicts": True, "update_fields": update_fields}
+            if connection.features.supports_update_conflicts_with_target:
+                options["unique_fields"] = [model._meta.pk.name]
+        model._base_manager.using(using).bulk_create(buffer.objects, batch_size=batch_size, **options)
+
+        for field_name in {name for name, _, _ in buffer.m2m}:
+            field = model._meta.get_field(field_name)
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            links = [(pk, values) for name, pk, values in buffer.m2m if name == field_name]
+            # Связи объекта заменяются целиком, как при obj.field.set() в loaddata
+            through._base_manager.using(using).filter(**{f"{source}_id__in": [pk for pk, _ in links]}).delete()
+            through._base_manager.using(using).bulk_create(
+                [through(**{f"{source}_id": pk, f"{target}_id": value}) for pk, values in links for value in values],
+                batch_size=batch_size)
+
+        buffer.loaded += len(buffer.objects)
+        buffer.objects, buffer.m2m = [], []
+        if progress:
+            progress(model._meta.label_lower, buffer.loaded)
+
+    with transaction.atomic(using=using), connection.constraint_checks_disabled():
+        for data in iter_json_array(stream):
+            for obj in serializers.deserialize("python", [data], using=using, ignorenonexistent=True):
+                model = type(obj.object)
+                buffer = buffers.setdefault(model, _ModelBuffer(model))
+                buffer.objects.append(obj.object)
+                buffer.m2m.extend((name, obj.object.pk, values) for name, values in (obj.m2m_data or {}).items())
+                if len(buffer.objects) >= batch_size:
+                    flush(buffer)
+
+        for model in serializers.sort_dependencies(
+                [(model._meta.app_config, [model]) for model in buffers], allow_cycles=True):
+            flush(buffers[model])
+
+        tables = [model._meta.db_table for model in buffers]
+        connection.check_constraints(table_names=tables)
+
+        # После записи с явными pk счётчики последовательностей нужно сдвинуть (PostgreSQL)
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), list(buffers))
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+
+        if Entry in buffers or Comment in buffers:
+            recount_comment_counters(using=using)
+    invalidate_sidebar()
+    invalidate_pages()
+
+    return {model._meta.label_lower: buffer.loaded for model, buffer in buffers.items()}
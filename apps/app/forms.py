@@ -1,5 +1,5 @@
 from django import forms
-from .models import Comment, Entry
+from .models import Comment, Entry, AuthorProfile
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UsernameField
 from django.forms import EmailField
@@ -32,3 +32,8 @@ class EntryForm(forms.ModelForm):
             'body_text': forms.Textarea(attrs={'id': 'id_content'}),
             # Другие настройки виджетов по необходимости
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Подпись автора в списке выбора - имя пользователя, без запроса на каждого автора
+        self.fields['authors'].queryset = AuthorProfile.objects.select_related('user')
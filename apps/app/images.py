@@ -0,0 +1,139 @@
+"""
+Конвейер обработки картинок: аватары пользователей (UserProfile.avatar) и
+картинки статей (Entry.image).
+
+Для каждой загруженной картинки создаются уменьшенные копии (rendition):
+    thumb - миниатюра 200x200 (аватары в комментариях);
+    card - картинка карточки статьи на главной и в блоге;
+    full - картинка на странице статьи;
+    card_webp - картинка карточки в формате WebP (легче JPEG/PNG при том же качестве).
+Оригинал не изменяется. Копии лежат рядом в MEDIA_ROOT/renditions/<путь оригинала без расширения>/<имя>.<расширение>.
+URL копии вычисляется по имени оригинала (rendition_url) без обращения к диску:
+копии создаются при загрузке файла, а не при выводе страницы.
+
+Обработка выполняется вне запроса: после коммита транзакции задача ставится в
+очередь, которую разбирает фоновый поток процесса. Модели ставят задачу только
+если файл действительно изменился, пакетная загрузка (seeding.py, synthetic.py) -
+для картинок записанных статей. Для файлов, записанных в обход моделей, копии
+создаются командой `python manage.py make_renditions`.
+"""
+
+import logging
+import os
+import queue
+import threading
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, FileSystemStorage
+from django.db import transaction
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# Имя копии: (максимальный размер, формат). Формат None - как у оригинала
+RENDITIONS = {
+    "thumb": ((200, 200), None),
+    "card": ((800, 800), None),
+    "full": ((1600, 1600), None),
+    "card_webp": ((800, 800), "WEBP"),
+}
+AVATAR_RENDITIONS = ("thumb",)
+ENTRY_RENDITIONS = ("thumb", "card", "full", "card_webp")
+
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+# Копии однозначно определяются именем оригинала (а оно - его содержимым, см. storage.py),
+# поэтому пишутся под своим именем в обычное файловое хранилище MEDIA_ROOT
+rendition_storage = FileSystemStorage()
+
+
+def rendition_name(name, rendition):
+    """Путь копии rendition для файла name в хранилище (вычисляется без обращения к диску)"""
+    base, ext = os.path.splitext(name)
+    image_format = RENDITIONS[rendition][1]
+    ext = f".{EXTENSIONS[image_format]}" if image_format else ext
+    return f"renditions/{base}/{rendition}{ext}"
+
+
+def rendition_url(name, rendition):
+    """URL копии rendition для файла name (вычисляется без обращения к диску)"""
+    return rendition_storage.url(rendition_name(name, rendition))
+
+
+@lru_cache(maxsize=None)
+def rendition_supported(rendition):
+    """Создаёт ли эта сборка Pillow копии rendition (поддержка WebP необязательна)"""
+    return RENDITIONS[rendition][1] != "WEBP" or features.check("webp")
+
+
+def make_renditions(name, renditions):
+    """Создание недостающих копий renditions для файла name (синхронно)"""
+    missing = [rendition for rendition in renditions
+               if not rendition_storage.exists(rendition_name(name, rendition))]
+    if not missing or not default_storage.exists(name):
+        return []
+
+    with default_storage.open(name) as file:
+        source = Image.open(file)
+        source.load()
+    created = []
+    for rendition in missing:
+        size, image_format = RENDITIONS[rendition]
+        image_format = image_format or source.format or "PNG"
+        if not rendition_supported(rendition):  # Pillow собран без поддержки WebP
+            continue
+        image = source.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, quality=85, optimize=True)
+        created.append(rendition_storage.save(rendition_name(name, rendition), ContentFile(buffer.getvalue())))
+    return created
+
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        name, renditions = _queue.get()
+        try:
+            make_renditions(name, renditions)
+        except Exception:
+            logger.exception("Не удалось обработать картинку %s", name)
+        finally:
+            _queue.task_done()
+
+
+def _enqueue(name, renditions):
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():  # Поток запускается при первой задаче
+            _worker = threading.Thread(target=_work, name="image-renditions", daemon=True)
+            _worker.start()
+    _queue.put((name, renditions))
+
+
+def schedule_renditions(name, renditions):
+    """
+    Постановка файла в очередь обработки после коммита текущей транзакции
+    (чтобы не обрабатывать файл, запись о котором откатилась).
+    При IMAGE_RENDITIONS_ASYNC=False обработка выполняется сразу (для тестов и скриптов).
+    """
+    if not name:
+        return
+    if not settings.IMAGE_RENDITIONS_ASYNC:
+        make_renditions(name, renditions)
+        return
+    transaction.on_commit(lambda: _enqueue(name, renditions))
+
+
+def wait_renditions():
+    """Ожидание обработки всех поставленных в очередь картинок (для скриптов заполнения БД)"""
+    _queue.join()
@@ -0,0 +1,97 @@
+import os
+import random
+import sqlite3
+import threading
+from tempfile import TemporaryDirectory
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from project.sqlite import apply_pragmas, TIMEOUT
+
+ROWS = 10000
+
+
+class Command(BaseCommand):
+    help = "Замер чтений/записей в секунду для SQLite с настройками по умолчанию и с профилем " \
+           "SQLITE_PRODUCTION (project/sqlite.py) при параллельных читателях и писателях"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=3, help="Длительность замера каждого профиля")
+        parser.add_argument("--readers", type=int, default=4, help="Число потоков-читателей")
+        parser.add_argument("--writers", type=int, default=2, help="Число потоков-писателей")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Читателей: {options['readers']}, писателей: {options['writers']}, "
+                          f"{options['seconds']} c на профиль")
+        for profile in ("default", "production"):
+            with TemporaryDirectory() as directory:
+                path = os.path.join(directory, "bench.sqlite3")
+                self.prepare(path, profile)
+                result = self.run(path, profile, options)
+            self.stdout.write(
+                f"{profile:>10}: чтений {result['reads'] / options['seconds']:>9.0f}/c, "
+                f"записей {result['writes'] / options['seconds']:>7.0f}/c, "
+                f"ошибок 'database is locked': {result['locked']}")
+
+    @staticmethod
+    def connect(path, profile):
+        """
+        default - как Django без профиля: новое соединение на каждый запрос, timeout 5 с;
+        production - постоянное соединение с PRAGMA профиля
+        """
+        connection = sqlite3.connect(path, timeout=TIMEOUT if profile == "production" else 5,
+                                     check_same_thread=False)
+        if profile == "production":
+            apply_pragmas(connection.cursor())
+        return connection
+
+    def prepare(self, path, profile):
+        connection = self.connect(path, profile)
+        connection.execute("CREATE TABLE entry (id INTEGER PRIMARY KEY, headline TEXT, rating REAL)")
+        connection.executemany("INSERT INTO entry (headline, rating) VALUES (?, ?)",
+                               ((f"Статья {i}", random.random()) for i in range(ROWS)))
+        connection.commit()
+        connection.close()
+
+    def run(self, path, profile, options):
+        result = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def worker(write):
+            persistent = self.connect(path, profile) if profile == "production" else None
+            done = locked = 0
+            while not stop.is_set():
+                connection = persistent or self.connect(path, profile)
+                try:
+                    if write:
+                        with connection:  # Транзакция с commit
+                            connection.execute("INSERT INTO entry (headline, rating) VALUES (?, ?)",
+                                               ("Новая статья", random.random()))
+                    else:
+                        connection.execute("SELECT headline, rating FROM entry WHERE id = ?",
+                                           (random.randint(1, ROWS),)).fetchone()
+                    done += 1
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    locked += 1
+                finally:
+                    if persistent is None:
+                        connection.close()
+            if persistent is not None:
+                persistent.close()
+            with lock:
+                result["writes" if write else "reads"] += done
+                result["locked"] += locked
+
+        threads = [threading.Thread(target=worker, args=(False,)) for _ in range(options["readers"])]
+        threads += [threading.Thread(target=worker, args=(True,)) for _ in range(options["writers"])]
+        for thread in threads:
+            thread.start()
+        sleep(options["seconds"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return result
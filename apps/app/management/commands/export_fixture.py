@@ -0,0 +1,37 @@
+import sys
+from time import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.app.fixture_stream import export_fixture, BATCH_SIZE, DEFAULT_APP_LABELS
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка данных в фикстуру формата dumpdata (apps/app/fixture_stream.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("labels", nargs="*", default=list(DEFAULT_APP_LABELS),
+                            help="Приложения или модели (app, app.entry), по умолчанию: "
+                                 + ", ".join(DEFAULT_APP_LABELS))
+        parser.add_argument("-o", "--output", help="Файл для записи, по умолчанию stdout")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        t_start = time()
+
+        def progress(label, count):
+            if options["verbosity"] > 1:
+                self.stderr.write(f"{label}: {count}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                total = export_fixture(stream, options["labels"], options["batch_size"],
+                                       options["database"], progress)
+        else:
+            total = export_fixture(sys.stdout, options["labels"], options["batch_size"],
+                                   options["database"], progress)
+        if options["verbosity"]:
+            self.stderr.write(self.style.SUCCESS(
+                f"Выгружено объектов: {total}. Время выполнения: {time() - t_start:.4f} c"))
@@ -0,0 +1,47 @@
+from datetime import datetime
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.app.synthetic import SyntheticGenerator, REFERENCE_NOW
+
+# Готовые объёмы: blogs, users, authors, tags, entries, comments
+SCALES = {
+    "small": (50, 500, 100, 50, 2000, 20000),
+    "medium": (1000, 10000, 2000, 500, 100000, 1000000),
+    "large": (5000, 50000, 10000, 2000, 500000, 5000000),
+}
+VOLUMES = ("blogs", "users", "authors", "tags", "entries", "comments")
+
+
+class Command(BaseCommand):
+    help = "Генерация воспроизводимого синтетического набора данных блога заданного объёма " \
+           "для нагрузочного тестирования (apps/app/synthetic.py). Данные добавляются к существующим"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=SCALES, default="small", help="Готовый набор объёмов")
+        for volume in VOLUMES:
+            parser.add_argument(f"--{volume}", type=int, help="Переопределение объёма из --scale")
+        parser.add_argument("--max-depth", type=int, default=50, help="Максимальная глубина ответов")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--now", type=datetime.fromisoformat, default=REFERENCE_NOW,
+                            help="Опорный момент дат публикации в ISO 8601 с часовым поясом "
+                                 f"(по умолчанию {REFERENCE_NOW.isoformat()})")
+
+    def handle(self, *args, **options):
+        if options["now"].tzinfo is None:
+            raise CommandError("--now: укажите часовой пояс, например 2024-01-01T00:00:00+00:00")
+        volumes = dict(zip(VOLUMES, SCALES[options["scale"]]))
+        volumes.update({volume: options[volume] for volume in VOLUMES if options[volume] is not None})
+        try:
+            generator = SyntheticGenerator(max_depth=options["max_depth"], seed=options["seed"],
+                                           batch_size=options["batch_size"], now=options["now"], **volumes)
+        except ValueError as e:
+            raise CommandError(e)
+
+        t_start = time()
+        generator.generate()
+        for line in generator.report():
+            self.stdout.write(f"    {line}")
+        self.stdout.write(self.style.SUCCESS(f"Данные созданы. Время выполнения: {time() - t_start:.4f} c"))
@@ -0,0 +1,30 @@
+from time import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.app.fixture_stream import import_fixture, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Потоковая пакетная загрузка фикстуры формата dumpdata (apps/app/fixture_stream.py). " \
+           "Сигналы не вызываются: счётчики комментариев пересчитываются, кеши страниц сбрасываются после загрузки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture", help="Путь к JSON-фикстуре")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        t_start = time()
+
+        def progress(label, count):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{label}: {count}")
+
+        with open(options["fixture"], encoding="utf-8") as stream:
+            loaded = import_fixture(stream, options["batch_size"], options["database"], progress)
+        for label, count in loaded.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Загружено объектов: {sum(loaded.values())}. Время выполнения: {time() - t_start:.4f} c"))
@@ -0,0 +1,47 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch
+
+from project.loadtest import read_scenarios, build_plan, session_cookies, run, HttpTransport, WsgiTransport
+
+
+class Command(BaseCommand):
+    help = "Нагрузочное тестирование по сценариям из файла JSON Lines (project/loadtest.py): " \
+           "RPS и перцентили времени ответа по именам URL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="?", default="data/loadtest/mixed.jsonl",
+                            help="Файл сценариев JSON Lines")
+        parser.add_argument("--requests", type=int, default=1000, help="Всего запросов")
+        parser.add_argument("--concurrency", type=int, default=10, help="Число одновременных запросов")
+        parser.add_argument("--url", help="Адрес запущенного сервера (http://127.0.0.1:8000). "
+                                          "Без него запросы идут в WSGI-приложение в текущем процессе")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = read_scenarios(options["scenarios"])
+            plan = build_plan(scenarios, options["requests"], options["seed"])
+            cookies = session_cookies({planned.user for planned in plan})
+        except (OSError, ValueError, LookupError, NoReverseMatch) as e:
+            raise CommandError(e)
+
+        if options["url"]:
+            transport = HttpTransport(options["url"])
+        else:
+            host = next((host for host in settings.ALLOWED_HOSTS if host and host[0] not in "*."), "localhost")
+            transport = WsgiTransport(options["concurrency"], host)
+        self.stdout.write(f"Запросов: {len(plan)}, одновременно: {options['concurrency']}, "
+                          f"{'сервер ' + options['url'] if options['url'] else 'WSGI в текущем процессе'}")
+        try:
+            stats = asyncio.run(run(plan, transport, options["concurrency"], cookies))
+        finally:
+            transport.close()
+
+        for line in stats.report():
+            self.stdout.write(line)
+        for label, error in sorted(stats.last_error.items()):
+            self.stdout.write(self.style.ERROR(f"{label}: {error}"))
+        self.stdout.write(f"Время выполнения: {stats.elapsed:.2f} c, RPS: {len(plan) / stats.elapsed:.1f}")
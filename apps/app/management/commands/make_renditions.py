@@ -0,0 +1,22 @@
+from time import time
+
+from django.core.management.base import BaseCommand
+
+from apps.app.images import make_renditions, AVATAR_RENDITIONS, ENTRY_RENDITIONS
+from apps.app.models import UserProfile, Entry
+
+
+class Command(BaseCommand):
+    help = "Создание недостающих уменьшенных копий аватаров и картинок статей (apps/app/images.py)"
+
+    def handle(self, *args, **options):
+        t_start = time()
+        created = 0
+        sources = [(UserProfile.objects.values_list('avatar', flat=True), AVATAR_RENDITIONS),
+                   (Entry.objects.values_list('image', flat=True), ENTRY_RENDITIONS)]
+        for names, renditions in sources:
+            for name in names.distinct():
+                if name:
+                    created += len(make_renditions(name, renditions))
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано копий: {created}. Время выполнения: {time() - t_start:.4f} c"))
@@ -0,0 +1,23 @@
+from time import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.app.cache import invalidate_sidebar, invalidate_pages
+from apps.app.counters import recount_comment_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчёт денормализованных счётчиков комментариев (Entry.number_of_comments, " \
+           "Comment.number_of_replies) агрегирующими запросами со сбросом кешей страниц"
+
+    def handle(self, *args, **options):
+        t_start = time()
+        with transaction.atomic():
+            entries, comments = recount_comment_counters()
+        # Счётчики выводятся на страницах и в sidebar - после записи нужны новые версии кешей
+        invalidate_sidebar()
+        invalidate_pages()
+        self.stdout.write(self.style.SUCCESS(
+            f"Счётчики пересчитаны: статей {entries}, комментариев {comments}. "
+            f"Время выполнения: {time() - t_start:.4f} c"))
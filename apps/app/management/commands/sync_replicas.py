@@ -0,0 +1,30 @@
+import sqlite3
+from time import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Копирование основной БД SQLite в реплики SQLite (DATABASE_REPLICAS) для локальной " \
+           "проверки чтения из реплик. Реплики PostgreSQL обновляются репликацией самого PostgreSQL"
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError("Команда работает только с основной БД SQLite")
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            if replica['ENGINE'] != 'django.db.backends.sqlite3':
+                self.stdout.write(f"{alias}: не SQLite, пропущена")
+                continue
+            t_start = time()
+            connections[alias].close()  # Открытое соединение Django с репликой не должно мешать копированию
+            target = sqlite3.connect(replica['NAME'])
+            try:
+                primary.connection.backup(target)  # Онлайн-копия через SQLite backup API
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"{alias}: скопирована за {time() - t_start:.4f} c"))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['-pub_date', '-id'], name='entry_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+# Заполнение нового счётчика ответов (и сверка счётчика комментариев) для уже существующих данных.
+# SQL записан здесь, а не импортируется из apps/app/counters.py, чтобы миграция не менялась вместе с кодом
+RECOUNT_COUNTERS_SQL = [
+    """
+    UPDATE app_entry SET number_of_comments = (
+        SELECT COUNT(*) FROM app_comment WHERE app_comment.entry_id = app_entry.id
+    )
+    """,
+    """
+    UPDATE app_comment SET number_of_replies = (
+        SELECT COUNT(*) FROM app_comment AS reply WHERE reply.parent_id = app_comment.id
+    )
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_entry_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='number_of_replies',
+            field=models.IntegerField(blank=True, default=0, help_text='Поддерживается автоматически (apps/app/signals.py)', verbose_name='число ответов'),
+        ),
+        migrations.RunSQL(RECOUNT_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
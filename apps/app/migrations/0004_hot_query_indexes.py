@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_comment_number_of_replies'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['entry', 'created_at', 'id'], name='comment_entry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['entry', 'created_at', 'id'], name='comment_entry_root_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['blog', '-pub_date', '-id'], name='entry_blog_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['-number_of_comments'], name='entry_comments_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entry',
+            index=models.Index(fields=['status', '-pub_date'], name='entry_status_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entry',
+            name='entry_status_pub_date_idx',
+        ),
+    ]
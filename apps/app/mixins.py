@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from project.db_routing import use_primary, use_replica
+
+from .cache import get_pages_version, get_page, set_page
+
+
+class AnonymousPageCacheMixin:
+    """
+    Кеширование страниц для анонимных пользователей (включается ANONYMOUS_PAGE_CACHE=true в .env).
+
+    Для GET/HEAD запросов анонимного пользователя:
+        * в ответ добавляются ETag и Last-Modified, вычисленные из версии страниц
+          (времени последнего изменения блогов, статей, тегов, комментариев - см. signals.py);
+          версия хранится в общем для всех процессов кеше без срока жизни (см. cache.py),
+          поэтому без изменений контента эти значения не меняются;
+        * если браузер прислал If-None-Match/If-Modified-Since с актуальными значениями,
+          сразу возвращается 304 Not Modified без обращения к view и шаблону;
+        * отрендеренная страница сохраняется в кеш по адресу (вместе с номером страницы/курсором)
+          и отдаётся из кеша до следующего изменения контента.
+    Авторизованные пользователи видят персональные элементы страницы, поэтому для них кеш не используется.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.ANONYMOUS_PAGE_CACHE or request.method not in ('GET', 'HEAD') \
+                or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        version = get_pages_version()
+        etag = quote_etag(str(version))
+        last_modified = version // 10 ** 9  # в секундах, как в заголовке Last-Modified
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:  # 304 Not Modified (или 412 Precondition Failed)
+            return response
+
+        path = request.get_full_path()
+        response = get_page(version, path)
+        if response is None:
+            # Страница для кеша строится из основной БД, а не из возможно отставшей реплики
+            with use_primary():
+                response = super().dispatch(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if hasattr(response, 'render'):  # TemplateResponse рендерится лениво, в кеш кладём готовый HTML
+                    response.render()
+            set_page(version, path, response)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)  # Браузер хранит страницу, но каждый раз проверяет её актуальность
+        patch_vary_headers(response, ('Cookie',))  # Для авторизованных (с cookie сессии) страница другая
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Чтение для GET/HEAD запросов идёт в реплики БД (если они заданы в DATABASE_REPLICAS),
+    см. project/db_routing.py. Для страниц, где пользователь должен сразу видеть
+    результат своих действий, подключать не нужно.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
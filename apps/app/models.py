@@ -1,11 +1,11 @@
 from django.db import models
 from datetime import date, datetime, timezone
 from django.core.validators import RegexValidator
-from PIL import Image
 from django.contrib.auth.models import User
 from tinymce.models import HTMLField
 from transliterate import translit
 import re
+from .images import schedule_renditions, AVATAR_RENDITIONS, ENTRY_RENDITIONS
 
 """
 Рассматриваются 4 таблицы условно обобщающие функционал блога
@@ -65,7 +65,9 @@ class UserProfile(models.Model):
     bio - текст о себе
     avatar - картинка профиля. Стоят задачи(просто, чтобы показать как это можно решить):
         1. При сохранении необходимо переименовать картинку по шаблону user_hash
+           (имя файла - хеш содержимого, см. storage.ContentAddressedStorage)
         2. Необходимо все передаваемые картинки для аватара приводить к размеру 200х200
+           (миниатюра создаётся в фоне конвейером images.py, оригинал не изменяется)
     phone_number - номер телефона с валидацией при внесении
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="user_profile")
@@ -103,23 +105,23 @@ class UserProfile(models.Model):
     def __str__(self):
         return self.user.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_avatar = instance.__dict__.get('avatar')  # Имя файла, сохранённое в БД
+        return instance
+
     def save(self, *args, **kwargs):
         # Пример переопределение метода save для изменения размера картинки
         # при сохранении в БД
         # Вызов родительского save() метода
         super().save(*args, **kwargs)
 
-        # Открытие картинки
-        image = Image.open(self.avatar.path)
-
-        # Определение желаемого размера картинки
-        desired_size = (200, 200)
-
-        # Изменение размера
-        image.thumbnail(desired_size, Image.ANTIALIAS)
-
-        # Сохранение картинки с перезаписью
-        image.save(self.avatar.path)
+        # Миниатюра 200х200 создаётся в фоне и только если картинка изменилась
+        # (при изменении города или телефона файл не обрабатывается)
+        if self.avatar.name != getattr(self, '_loaded_avatar', None):
+            schedule_renditions(self.avatar.name, AVATAR_RENDITIONS)
+            self._loaded_avatar = self.avatar.name
 
 
 class AuthorProfile(models.Model):
@@ -227,7 +229,8 @@ class Entry(models.Model):
     rating = models.FloatField(default=0.0, blank=True)
     tags = models.ManyToManyField('Tag', verbose_name="теги статьи")
 
-    def save(self, *args, **kwargs):
+    def fill_defaults(self):
+        """Заполнение вычисляемых полей перед записью (вызывается и при пакетной записи, см. seeding.py)"""
         if self.slug_headline is None:
             # Генерация транслитерированного slug на основе headline перед сохранением
             slug_headline = "-".join(translit(self.headline, 'ru', reversed=True).lower().split())
@@ -236,14 +239,39 @@ class Entry(models.Model):
             # Если запись отложена, но дата не указана, установите текущую дату
             self.pub_date = datetime.now(timezone.utc)
 
+    def save(self, *args, **kwargs):
+        self.fill_defaults()
         super().save(*args, **kwargs)
 
+        # Уменьшенные копии картинки (для карточек, страницы статьи, WebP) создаются в фоне,
+        # только если картинка изменилась
+        if self.image.name != getattr(self, '_loaded_image', None):
+            schedule_renditions(self.image.name, ENTRY_RENDITIONS)
+            self._loaded_image = self.image.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image')  # Имя файла, сохранённое в БД
+        return instance
+
     def __str__(self):
         return self.headline
 
     class Meta:
         unique_together = ('blog', 'headline', 'slug_headline')
         ordering = ('-pub_date',)  # При выводе запроса проводить сортировку по дате
+        indexes = [
+            # Индекс для курсорной пагинации ленты по (pub_date, id)
+            models.Index(fields=['-pub_date', '-id'], name='entry_pub_date_id_idx'),
+            # Статьи блога в порядке ленты (BlogView) без сортировки во временном B-дереве
+            models.Index(fields=['blog', '-pub_date', '-id'], name='entry_blog_pub_date_idx'),
+            # Самые обсуждаемые статьи (главная, блок "Актуальное").
+            # Индекса по status нет: статьи автора по статусу (личный кабинет) читаются
+            # через строки автора в Entry.authors, а индекс по status уводил SQLite в
+            # перебор всех опубликованных статей
+            models.Index(fields=['-number_of_comments'], name='entry_comments_idx'),
+        ]
         permissions = [
             ("can_view_entry", "Может просматривать статью"),
             ("can_add_entry", "Может создать статью"),
@@ -286,6 +314,9 @@ class Comment(models.Model):
                                verbose_name="родительский комментарий",
                                help_text="Комментарий с которого началась новая ветка",
                                )
+    number_of_replies = models.IntegerField(default=0, blank=True,
+                                            verbose_name="число ответов",
+                                            help_text="Поддерживается автоматически (apps/app/signals.py)")
 
     created_at = models.DateTimeField(
         auto_now_add=True
@@ -295,6 +326,16 @@ class Comment(models.Model):
         auto_now=True
     )  # Дата и время обновления объекта сущности в базе данных
 
+    class Meta:
+        indexes = [
+            # Всё дерево комментариев статьи в порядке создания (services.get_comment_tree)
+            models.Index(fields=['entry', 'created_at', 'id'], name='comment_entry_created_idx'),
+            # Ветки верхнего уровня статьи (services.get_comment_threads_page, личный кабинет).
+            # Частичный индекс (SQLite, PostgreSQL) содержит только комментарии без родителя
+            models.Index(fields=['entry', 'created_at', 'id'], name='comment_entry_root_idx',
+                         condition=models.Q(parent__isnull=True)),
+        ]
+
     def __str__(self):
         return f"Пользователь: {self.user.username}; " \
                f"Статья: {self.entry.headline[:30]}; " \
@@ -0,0 +1,140 @@
+"""
+Курсорная (keyset) пагинация статей по паре (pub_date, id).
+
+В отличие от django.core.paginator.Paginator не выполняет COUNT(*) и не
+использует OFFSET: следующая страница выбирается условием "строго после
+последней показанной статьи", поэтому запрос для N-й страницы стоит столько
+же, сколько и для первой (при наличии индекса по (pub_date, id)).
+
+Курсор - непрозрачная для клиента строка (base64 от JSON), содержащая
+направление и ключ граничной статьи.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать"""
+
+
+def encode_cursor(direction, pub_date, pk):
+    """Кодирует направление ('n' - вперёд, 'p' - назад) и ключ статьи в курсор"""
+    data = {"d": direction, "t": pub_date.isoformat() if pub_date else None, "i": pk}
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор, возвращает (direction, pub_date, pk)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        direction, pub_date, pk = data["d"], data["t"], int(data["i"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+    if direction not in ("n", "p"):
+        raise InvalidCursor(cursor)
+    if pub_date is not None:
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None:
+            raise InvalidCursor(cursor)
+    return direction, pub_date, pk
+
+
+class KeysetPage:
+    """
+    Страница курсорной пагинации. Повторяет часть интерфейса
+    django.core.paginator.Page (object_list, has_next, has_previous,
+    итерация, len), но вместо номеров страниц отдаёт курсоры.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor("n", last.pub_date, last.pk)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        first = self.object_list[0]
+        return encode_cursor("p", first.pub_date, first.pk)
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по убыванию (pub_date, id). Статьи без даты публикации (черновики)
+    идут в конце ленты, как и при сортировке '-pub_date' в SQLite.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        """
+        Возвращает страницу после (или перед) статьёй, закодированной в курсоре.
+        Без курсора - первая страница. Для некорректного курсора - InvalidCursor.
+        """
+        if not cursor:
+            return self._forward(self.queryset, has_previous=False)
+        direction, pub_date, pk = decode_cursor(cursor)
+        if direction == "n":
+            return self._forward(self.queryset.filter(self._after(pub_date, pk)), has_previous=True)
+        return self._backward(self.queryset.filter(self._before(pub_date, pk)))
+
+    def _forward(self, queryset, has_previous):
+        rows = list(queryset.order_by(F("pub_date").desc(nulls_last=True), "-id")[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], has_next=len(rows) > self.per_page, has_previous=has_previous)
+
+    def _backward(self, queryset):
+        # Выбираем в обратном порядке ближайшие к курсору статьи, затем разворачиваем
+        rows = list(queryset.order_by(F("pub_date").asc(nulls_first=True), "id")[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    @staticmethod
+    def _after(pub_date, pk):
+        """Условие "статья идёт в ленте после (pub_date, pk)" """
+        if pub_date is None:
+            return Q(pub_date__isnull=True, id__lt=pk)
+        return Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk) | Q(pub_date__isnull=True)
+
+    @staticmethod
+    def _before(pub_date, pk):
+        """Условие "статья идёт в ленте перед (pub_date, pk)" """
+        if pub_date is None:
+            return Q(pub_date__isnull=False) | Q(pub_date__isnull=True, id__gt=pk)
+        return Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
@@ -0,0 +1,89 @@
+"""
+Пакетное создание пользователей (скрипты заполнения БД, тестовые данные).
+
+Основное время при создании пользователя - хеширование пароля (PBKDF2 с сотнями
+тысяч итераций), запись в БД по сравнению с ним почти ничего не стоит. Поэтому:
+    - пароли хешируются в пуле процессов по числу ядер (хеширование упирается в
+      процессор, потоки из-за GIL его не ускоряют), процессы не работают с БД;
+    - хеши возвращаются в родительский процесс по мере готовности (потоком, без
+      накопления всех результатов), из них собираются объекты User;
+    - пользователи записываются через bulk_create пачками по batch_size.
+
+Профиль хеширования (HASHER_PROFILES):
+    default - хешер из настроек (PASSWORD_HASHERS[0]);
+    fast - тот же PBKDF2, но с малым числом итераций, для фикстур и тестов.
+      Такой пароль проверяется обычными настройками, а при первом входе
+      пользователя Django сам перехеширует его с полным числом итераций.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password, PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.db import transaction
+
+BATCH_SIZE = 1000
+HASH_CHUNK_SIZE = 64  # Паролей в одной задаче для процесса пула
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 с малым числом итераций (профиль fast)"""
+    iterations = 1000
+
+
+HASHER_PROFILES = {
+    "default": None,
+    "fast": FastPBKDF2PasswordHasher,
+}
+
+
+def _init_worker(settings_module):
+    """Настройка Django в процессе пула (при запуске процессов через spawn)"""
+    from django.conf import settings
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+        import django
+        django.setup()
+
+
+def _hash_password(args):
+    password, profile = args
+    hasher = HASHER_PROFILES[profile]
+    return make_password(password, hasher=hasher() if hasher else "default")
+
+
+def hash_passwords(passwords, profile="default", processes=None):
+    """
+    Генератор хешей паролей в исходном порядке. processes - число процессов
+    пула (по умолчанию - число ядер), при processes=1 хеширование в текущем процессе.
+    """
+    if profile not in HASHER_PROFILES:
+        raise ValueError(f"Неизвестный профиль хеширования: {profile!r}")
+    tasks = ((password, profile) for password in passwords)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        yield from map(_hash_password, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'project.settings'),)) as executor:
+        yield from executor.map(_hash_password, tasks, chunksize=HASH_CHUNK_SIZE)
+
+
+def provision_users(users_data, profile="default", processes=None, batch_size=BATCH_SIZE, **fields):
+    """
+    Создаёт пользователей по словарям {"username", "email", "password"} (пароли в
+    открытом виде). fields - общие значения полей для всех (например is_staff=True).
+    Вся запись выполняется в одной транзакции. Возвращает созданные объекты User.
+    """
+    users_data = list(users_data)
+    hashes = hash_passwords((data["password"] for data in users_data), profile=profile, processes=processes)
+    users = (User(username=data["username"], email=data.get("email", ""), password=password, **fields)
+             for data, password in zip(users_data, hashes))
+
+    created = []
+    with transaction.atomic():
+        while batch := list(islice(users, batch_size)):
+            created += User.objects.bulk_create(batch)
+    return created
@@ -0,0 +1,214 @@
+"""
+Пакетная загрузка данных блога (теги, статьи, комментарии) для скриптов заполнения БД.
+
+В отличие от записи по одной строке (create()/save() и .get() для каждой связи),
+BulkLoader:
+    - заранее загружает ключи связей (блоги по названию, авторов по id
+      пользователя, теги по названию, статьи по заголовку и по паре блог и
+      заголовок) в словари - по одному запросу на таблицу;
+    - записывает строки через bulk_create пачками по batch_size, включая
+      строки промежуточных таблиц многие-ко-многим (Entry.authors, Entry.tags);
+    - выполняет всю загрузку в одной транзакции;
+    - запоминает для каждой таблицы число строк и время записи (stats, report()).
+
+bulk_create не вызывает save() и сигналы, поэтому после загрузки загрузчик сам
+пересчитывает счётчики комментариев, сбрасывает кеши страниц и ставит в
+очередь обработку картинок статей.
+"""
+
+import re
+from datetime import datetime
+from time import time
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_sidebar, invalidate_pages
+from .counters import recount_comment_counters
+from .images import schedule_renditions, ENTRY_RENDITIONS
+from .models import Blog, AuthorProfile, Entry, Tag, Comment
+
+BATCH_SIZE = 1000
+
+re_split = re.compile(r'[ :-]')
+
+
+def parse_pub_date(value):
+    """Дата публикации из строки 'ГГГГ-ММ-ДД ЧЧ:ММ:СС' (None - текущее время)"""
+    pub_date = datetime(*map(int, re_split.split(value))) if value is not None else datetime.now()
+    return timezone.make_aware(pub_date)
+
+
+def resolve(mapping, key, message):
+    """Значение из словаря ключей, для отсутствующего ключа - понятная ошибка"""
+    try:
+        return mapping[key]
+    except KeyError:
+        raise ValueError(f"{message}: {key!r}") from None
+
+
+def resolve_unique(mapping, key, message):
+    """Единственное значение из словаря ключ -> список значений, для неоднозначного ключа - ошибка"""
+    values = resolve(mapping, key, message)
+    if len(values) > 1:
+        raise ValueError(f"Несколько статей ({len(values)}) с ключом {key!r}: укажите блог статьи (\"blog\")")
+    return values[0]
+
+
+def comment_depths(data):
+    """Уровень вложенности каждого комментария (parent_id - номер родителя в data, с 1)"""
+    depths = [None] * len(data)
+    for index in range(len(data)):
+        chain, seen, current = [], set(), index
+        while depths[current] is None:
+            parent_id = data[current].get("parent_id")
+            if not parent_id:
+                depths[current] = 0
+                break
+            if current in seen:
+                raise ValueError(f"Цикл в parent_id у комментария №{current + 1}")
+            chain.append(current)
+            seen.add(current)
+            current = parent_id - 1
+        for child in reversed(chain):
+            depths[child] = depths[data[child]["parent_id"] - 1] + 1
+    return depths
+
+
+class BatchWriter:
+    """Общая часть пакетной записи: размер пачки и отчёт о записи по таблицам (stats, report())"""
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = []  # (таблица, число строк, время в секундах)
+
+    def report(self):
+        """Строки отчёта: таблица, число строк, время и скорость записи"""
+        return [f"{table}: {rows} строк за {seconds:.4f} c ({rows / seconds if seconds else 0:.0f} строк/с)"
+                for table, rows, seconds in self.stats]
+
+
+class BulkLoader(BatchWriter):
+    """
+    Пакетный загрузчик. Данные - списки словарей в формате data/json_data/*.json:
+        теги: {"name", "slug_name"};
+        статьи: {"blog" (название), "headline", ..., "authors_id" (id пользователей), "tags" (названия)};
+        комментарии: {"user_id", "entry" (заголовок), "blog" (название, необязательно), "text",
+            "parent_id"}, где parent_id - порядковый номер (с 1) родительского комментария
+            в этом же списке. Заголовки статей разных блогов могут совпадать: если
+            заголовок неоднозначен, статья ищется по паре (blog, entry), без "blog" - ошибка.
+    validate=True - проверка полей (clean_fields) без запросов к БД: связи уже
+    проверены при разрешении ключей, а проверка уникальности выполняется самой БД.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, validate=True):
+        super().__init__(batch_size)
+        self.validate = validate
+
+    def _clean(self, obj, exclude):
+        if self.validate:
+            obj.clean_fields(exclude=exclude)
+
+    def _bulk_create(self, model, objs, label=None):
+        t_start = time()
+        objs = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.stats.append((label or model._meta.db_table, len(objs), time() - t_start))
+        return objs
+
+    def load_tags(self, data):
+        tags = [Tag(**tag) for tag in data]
+        for tag in tags:
+            self._clean(tag, exclude=None)
+        return self._bulk_create(Tag, tags)
+
+    def load_entries(self, data):
+        blogs = dict(Blog.objects.values_list("name", "id"))
+        authors = dict(AuthorProfile.objects.values_list("user_id", "id"))
+        tags = dict(Tag.objects.values_list("name", "id"))
+
+        entries = []
+        for item in data:
+            entry = Entry(blog_id=resolve(blogs, item["blog"], "Нет блога с названием"),
+                          headline=item["headline"],
+                          slug_headline=item.get("slug_headline"),
+                          summary=item["summary"],
+                          body_text=item.get("body_text", ""),
+                          image=item.get("image") or Entry._meta.get_field("image").default,
+                          pub_date=parse_pub_date(item.get("pub_date")),
+                          number_of_comments=item.get("number_of_comments") or 0,
+                          number_of_pingbacks=item.get("number_of_pingbacks") or 0,
+                          rating=item.get("rating") or 0.0)
+            entry.fill_defaults()
+            self._clean(entry, exclude=["blog"])
+            entries.append(entry)
+        entries = self._bulk_create(Entry, entries)
+
+        # Строки промежуточных таблиц многие-ко-многим
+        authors_through = Entry.authors.through
+        tags_through = Entry.tags.through
+        entry_authors, entry_tags = [], []
+        for entry, item in zip(entries, data):
+            entry_authors.extend(authors_through(entry_id=entry.id,
+                                                 authorprofile_id=resolve(authors, user_id, "Нет профиля автора у пользователя"))
+                                 for user_id in item.get("authors_id", []))
+            entry_tags.extend(tags_through(entry_id=entry.id, tag_id=resolve(tags, name, "Нет тега с названием"))
+                              for name in item.get("tags", []))
+        self._bulk_create(authors_through, entry_authors)
+        self._bulk_create(tags_through, entry_tags)
+        return entries
+
+    @staticmethod
+    def _resolve_entry(entries, blog_entries, item):
+        if item.get("blog") is not None:
+            return resolve_unique(blog_entries, (item["blog"], item["entry"]), "Нет статьи в блоге с заголовком")
+        return resolve_unique(entries, item["entry"], "Нет статьи с заголовком")
+
+    def load_comments(self, data):
+        entries, blog_entries = {}, {}
+        for blog, headline, entry_id in Entry.objects.values_list("blog__name", "headline", "id"):
+            entries.setdefault(headline, []).append(entry_id)
+            blog_entries.setdefault((blog, headline), []).append(entry_id)
+        users = {user_id: user_id for user_id in User.objects.values_list("id", flat=True)}
+
+        comments = []
+        for item in data:
+            comment = Comment(user_id=resolve(users, item["user_id"], "Нет пользователя с id"),
+                              entry_id=self._resolve_entry(entries, blog_entries, item),
+                              text=item["text"])
+            self._clean(comment, exclude=["user", "entry", "parent"])
+            comments.append(comment)
+
+        # Комментарии записываются по уровням вложенности: к записи ответа id родителя уже известен
+        levels = {}
+        for index, depth in enumerate(comment_depths(data)):
+            levels.setdefault(depth, []).append(index)
+
+        t_start = time()
+        for depth in sorted(levels):
+            batch = []
+            for index in levels[depth]:
+                parent_id = data[index].get("parent_id")
+                if parent_id:
+                    comments[index].parent_id = comments[parent_id - 1].id
+                batch.append(comments[index])
+            Comment.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.stats.append((Comment._meta.db_table, len(comments), time() - t_start))
+        return comments
+
+    def load(self, tags=(), entries=(), comments=()):
+        """Загрузка всех данных в одной транзакции"""
+        with transaction.atomic():
+            self.load_tags(tags)
+            loaded = self.load_entries(entries)
+            self.load_comments(comments)
+
+            # bulk_create не вызывает сигналы (apps/app/signals.py)
+            t_start = time()
+            recount_comment_counters()
+            self.stats.append(("пересчёт счётчиков комментариев", len(loaded), time() - t_start))
+            for image in {entry.image.name for entry in loaded}:
+                schedule_renditions(image, ENTRY_RENDITIONS)
+        invalidate_sidebar()
+        invalidate_pages()
+        return self.stats
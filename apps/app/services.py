@@ -0,0 +1,204 @@
+"""
+Сервисный слой приложения app - функции, которые собирают данные для страниц
+за ограниченное (не зависящее от объёма данных) число запросов к БД.
+"""
+
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Prefetch, prefetch_related_objects
+
+from django.db.models.expressions import RawSQL
+
+from .models import Entry, AuthorProfile, Comment
+from .pagination import KeysetPaginator, InvalidCursor
+from .cache import get_blogs, get_tag_cloud
+
+INDEX_PAGE_SIZE = 3  # Количество статей на одной странице главной
+INDEX_TOP_SIZE = 5  # Количество статей в блоках "Актуальное" и "Свежее"
+BLOG_PAGE_SIZE = 6  # Количество статей на одной странице блога
+COMMENT_THREADS_PER_PAGE = 20  # Количество веток (комментариев верхнего уровня) на одной странице статьи
+
+
+def entry_card_queryset():
+    """
+    Базовый QuerySet статей для отображения карточек.
+    Блог подтягивается через JOIN, а полный текст статьи (body_text) не
+    загружается, так как в карточках он не выводится.
+    """
+    return Entry.objects.select_related("blog").defer("body_text")
+
+
+def prefetch_entry_cards(entries):
+    """
+    Одним запросом на каждое отношение загружает авторов (вместе с пользователями)
+    и теги для всех переданных статей, независимо от того, из какой выборки они пришли.
+    """
+    prefetch_related_objects(
+        entries,
+        Prefetch("authors", queryset=AuthorProfile.objects.select_related("user")),
+        "tags",
+    )
+    return entries
+
+
+def paginate_entries(queryset, per_page, page_number=None, cursor=None, keyset=False):
+    """
+    Возвращает страницу статей.
+    keyset=False - обычная постраничная пагинация по номеру страницы (Paginator, COUNT(*) + OFFSET);
+    keyset=True - курсорная пагинация по (pub_date, id) без COUNT(*) и OFFSET (KeysetPaginator).
+    Объекты страницы сразу загружаются из БД (object_list - список).
+    """
+    if keyset:
+        try:
+            return KeysetPaginator(queryset, per_page).page(cursor)
+        except InvalidCursor:
+            # Если курсор испорчен, показать первую страницу.
+            return KeysetPaginator(queryset, per_page).page()
+
+    paginator = Paginator(queryset, per_page)
+    try:
+        page = paginator.page(page_number)
+    except PageNotAnInteger:
+        # Если страница не является целым числом, показать первую страницу.
+        page = paginator.page(1)
+    except EmptyPage:
+        # Если страница выходит за пределы допустимого диапазона (например, 9999), показать последнюю страницу результатов.
+        page = paginator.page(paginator.num_pages)
+    page.object_list = list(page.object_list)  # Выполняем запрос сразу, чтобы подгрузить к нему связи
+    return page
+
+
+def get_index_context(page_number=None, cursor=None, keyset=False, per_page=INDEX_PAGE_SIZE):
+    """
+    Собирает данные для главной страницы (IndexView).
+
+    Число запросов к БД постоянно и не зависит от количества статей:
+        1. блоги (из кеша sidebar, см. cache.py);
+        2. 5 самых обсуждаемых статей (с блогом через JOIN);
+        3. 5 самых свежих статей (с блогом через JOIN);
+        4. COUNT(*) для пагинатора (только для пагинации по номеру страницы);
+        5. статьи текущей страницы (с блогом через JOIN);
+        6. авторы (с пользователями) для статей из пунктов 2, 3, 5 - одним запросом;
+        7. теги для статей из пунктов 2, 3, 5 - одним запросом;
+        8. облако тегов (из кеша sidebar).
+    """
+    entries = entry_card_queryset()
+    most_entryes = list(entries.order_by('-number_of_comments')[:INDEX_TOP_SIZE])
+    fresh_entryes = list(entries[:INDEX_TOP_SIZE])
+    page = paginate_entries(entries, per_page, page_number=page_number, cursor=cursor, keyset=keyset)
+
+    # Связи загружаются одним проходом сразу для всех трёх выборок
+    prefetch_entry_cards(most_entryes + fresh_entryes + page.object_list)
+
+    return {"blogs": get_blogs(),
+            "most_entryes": most_entryes,
+            "entryes": page,
+            "fresh_entryes": fresh_entryes,
+            "tags": get_tag_cloud(),
+            }
+
+
+def get_blog_entries_page(blog, cursor=None, per_page=BLOG_PAGE_SIZE):
+    """
+    Страница статей блога (BlogView) с курсорной пагинацией: 3 запроса
+    (статьи, авторы, теги) на любой странице.
+    """
+    page = paginate_entries(entry_card_queryset().filter(blog=blog), per_page, cursor=cursor, keyset=True)
+    prefetch_entry_cards(page.object_list)
+    return page
+
+
+def comment_queryset():
+    """
+    Комментарии вместе с пользователями и их профилями (для аватара) одним запросом
+    через LEFT JOIN, упорядоченные по времени создания.
+    """
+    return Comment.objects.select_related("user", "user__user_profile").order_by("created_at", "id")
+
+
+def build_comment_tree(comments):
+    """
+    Собирает дерево из плоского списка комментариев в памяти, без обращений к БД.
+    У каждого комментария появляются атрибуты replies (список ответов) и depth
+    (уровень вложенности, 0 - ветка верхнего уровня). Возвращает список корней в
+    исходном порядке. Комментарий, родителя которого нет в списке, считается корнем.
+    """
+    by_id = {comment.id: comment for comment in comments}
+    roots = []
+    for comment in comments:
+        comment.replies = []
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.replies.append(comment)
+
+    stack = [(root, 0) for root in roots]  # Обход без рекурсии, глубина дерева не ограничена
+    while stack:
+        comment, depth = stack.pop()
+        comment.depth = depth
+        stack.extend((reply, depth + 1) for reply in comment.replies)
+    return roots
+
+
+def flatten_comment_tree(roots):
+    """
+    Комментарии дерева (после build_comment_tree) одним списком в порядке вывода:
+    каждый комментарий, за ним все его ответы. Обход без рекурсии, поэтому шаблон
+    выводит ветки любой глубины одним циклом, отступ задаётся по comment.depth.
+    """
+    rows = []
+    stack = list(reversed(roots))
+    while stack:
+        comment = stack.pop()
+        rows.append(comment)
+        stack.extend(reversed(comment.replies))
+    return rows
+
+
+def get_comment_tree(entry):
+    """Всё дерево комментариев статьи за один запрос"""
+    return build_comment_tree(list(comment_queryset().filter(entry=entry)))
+
+
+def descendants_sql(root_ids):
+    """
+    Рекурсивный CTE (поддерживается SQLite, PostgreSQL, MySQL 8), возвращающий id
+    всех ответов любого уровня на комментарии root_ids.
+    """
+    table = Comment._meta.db_table
+    placeholders = ", ".join(["%s"] * len(root_ids))
+    sql = f"""
+        WITH RECURSIVE thread(id) AS (
+            SELECT id FROM {table} WHERE parent_id IN ({placeholders})
+            UNION ALL
+            SELECT c.id FROM {table} c INNER JOIN thread t ON c.parent_id = t.id
+        )
+        SELECT id FROM thread
+    """
+    return RawSQL(sql, list(root_ids))
+
+
+def get_comment_threads_page(entry, page_number=None, per_page=COMMENT_THREADS_PER_PAGE):
+    """
+    Страница веток комментариев статьи для постов с большим числом комментариев.
+    Число запросов постоянно: COUNT(*) веток, ветки текущей страницы и все их
+    ответы любой глубины (через рекурсивный CTE). Ответы уже собраны в дерево
+    (атрибут replies у каждой ветки), а в page.comment_rows - все комментарии
+    страницы в порядке вывода (flatten_comment_tree).
+    """
+    roots = comment_queryset().filter(entry=entry, parent__isnull=True)
+    paginator = Paginator(roots, per_page)
+    try:
+        page = paginator.page(page_number)
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    roots = list(page.object_list)
+    replies = list(comment_queryset().filter(id__in=descendants_sql([root.id for root in roots]))) if roots else []
+    build_comment_tree(roots + replies)
+    page.object_list = roots
+    page.comment_rows = flatten_comment_tree(roots)
+    return page
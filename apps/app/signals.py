@@ -0,0 +1,70 @@
+"""
+Обработчики сигналов приложения app. Подключаются в DbConfig.ready() (apps.py).
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from project.sqlite import configure_connection
+
+from .models import Blog, Entry, Tag, Comment, UserProfile
+from .counters import change_comment_counters, thread_deleted
+from .cache import invalidate_sidebar, invalidate_pages
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_counters(sender, instance, created, raw=False, **kwargs):
+    # При загрузке фикстур (raw=True) счётчики уже записаны в самих данных
+    if created and not raw:
+        change_comment_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_counters(sender, instance, origin=None, **kwargs):
+    # origin - объект или QuerySet, с которого начался каскад; сигналы post_delete
+    # приходят уже после удаления всех комментариев каскада. При удалении ветки
+    # (comment.delete()) счётчики обновляются один раз, для её корня: ответы удалены
+    # вместе с родителями. Для QuerySet.delete() - по каждой строке.
+    if isinstance(origin, Comment):
+        if instance.pk == origin.pk:
+            thread_deleted(instance)
+        return
+    change_comment_counters(instance, -1)
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Entry.tags.through)
+def invalidate_sidebar_cache(sender, action=None, **kwargs):
+    # Список блогов и теги блогов зависят от блогов, статей и связей статья-тег.
+    # Для m2m_changed реагируем только на уже выполненные изменения (post_add, post_remove, post_clear)
+    if action is None or action.startswith("post_"):
+        invalidate_sidebar()
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=UserProfile)
+@receiver(m2m_changed, sender=Entry.tags.through)
+@receiver(m2m_changed, sender=Entry.authors.through)
+def invalidate_pages_cache(sender, action=None, **kwargs):
+    # Страницы показывают ещё и комментарии с аватарами и авторов статей
+    if action is None or action.startswith("post_"):
+        invalidate_pages()
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    # PRAGMA профиля SQLITE_PRODUCTION (project/sqlite.py) для каждого нового соединения
+    configure_connection(connection)
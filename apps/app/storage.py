@@ -0,0 +1,85 @@
+"""
+Хранилище медиафайлов с адресацией по содержимому (MEDIA_ROOT).
+
+Имя файла в хранилище - SHA-256 его содержимого: `avatars/<sha256>.jpg`.
+Поэтому:
+    - одинаковые файлы (например, одна и та же картинка из
+      downloaded_avatars для разных профилей) хранятся на диске один раз:
+      если файл с таким хешем уже есть, он не записывается повторно;
+    - файл из локальной папки (скрипты заполнения БД) по возможности не
+      копируется, а подключается жёсткой ссылкой;
+    - повторная загрузка того же файла даёт то же имя, и модели определяют
+      "файл не изменился" простым сравнением имён (см. UserProfile.save,
+      Entry.save), не читая файлы с диска.
+
+Один файл может использоваться несколькими записями, поэтому удалять файлы
+из хранилища вручную при удалении записи нельзя.
+"""
+
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла (читается частями, позиция в файле восстанавливается)"""
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, сохраняющий файлы под именем, равным хешу содержимого"""
+
+    def hashed_name(self, name, digest):
+        """Имя файла в той же папке: <папка>/<хеш><расширение>"""
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f"{digest}{ext}")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(self.generate_filename(name), content_hash(content))
+        if self.exists(name):  # Такой файл уже есть - повторно не записываем
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        source = self._source_path(content)
+        if source is not None:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(source, full_path)
+            except FileExistsError:  # Тот же файл уже записан другим процессом
+                return name
+            except OSError:  # Другая файловая система или ссылки не поддерживаются - обычная запись
+                pass
+            else:
+                return name
+        return super()._save(name, content)
+
+    @staticmethod
+    def _source_path(content):
+        """
+        Путь к обычному локальному файлу, из которого пришло содержимое (File(open(path))).
+        Для загруженных через запрос файлов None - их FileSystemStorage и так перемещает без копирования.
+        """
+        if hasattr(content, "temporary_file_path"):
+            return None
+        path = getattr(getattr(content, "file", None), "name", None)
+        if isinstance(path, str) and os.path.isfile(path):
+            return path
+        return None
@@ -0,0 +1,239 @@
+"""
+Генератор синтетических данных блога для нагрузочного тестирования
+(python manage.py generate_dataset).
+
+Объёмы задаются параметрами (тысячи блогов, сотни тысяч статей, миллионы
+комментариев), результат воспроизводим: случайные величины и тексты Faker
+зависят только от seed (по умолчанию 42, как в fill_data_in_db.py), а даты
+публикации отсчитываются от опорного момента now (по умолчанию постоянный
+REFERENCE_NOW, а не текущее время).
+
+Чтобы приблизиться к реальным данным:
+    - блоги, авторы и теги выбираются с перекосом (skewed): небольшая часть
+      популярных блогов и тегов получает большую часть статей;
+    - у статьи 1-5 авторов и 1-6 тегов (чаще 1-2 автора и 2-3 тега);
+    - комментарии распределены по статьям с перекосом (обсуждаемые статьи с
+      десятками тысяч комментариев), внутри статьи комментарий с
+      вероятностью REPLY_TO_LAST отвечает на предыдущий - так получаются
+      длинные цепочки ответов глубиной до max_depth.
+
+Запись:
+    - только bulk_create пачками по batch_size, в одной транзакции;
+    - id назначаются заранее (после текущего максимума), поэтому ответы
+      ссылаются на родителей без чтения id из БД, а в памяти держатся только
+      текущая пачка и комментарии текущей статьи;
+    - тексты берутся из заранее сгенерированного Faker набора фраз
+      (POOL_SIZE), а не генерируются на каждую строку;
+    - счётчики комментариев пересчитываются после записи (counters.py), копии
+      картинки статей по умолчанию ставятся в очередь обработки (images.py).
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from time import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from faker import Faker
+from transliterate import translit
+
+from .cache import invalidate_sidebar, invalidate_pages
+from .counters import recount_comment_counters
+from .images import schedule_renditions, ENTRY_RENDITIONS
+from .models import Blog, AuthorProfile, Entry, Tag, Comment, make_slug
+from .seeding import BatchWriter
+
+POOL_SIZE = 1000  # Число заготовленных фраз каждого вида
+REPLY_TO_LAST = 0.5  # Вероятность ответа на предыдущий комментарий статьи
+REPLY_TO_ANY = 0.3  # Вероятность ответа на случайный комментарий статьи (иначе - новая ветка)
+PUB_DATE_DAYS = 5 * 365  # Даты публикации - за 5 лет до опорного момента
+REFERENCE_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)  # Опорный момент дат публикации по умолчанию
+
+
+def skewed(rng, count, power=3):
+    """Номер из range(count) с перекосом в сторону начала (чем больше power, тем сильнее)"""
+    return int(count * rng.random() ** power)
+
+
+def slugify(text):
+    """slug заголовка, как в Entry.fill_defaults"""
+    return make_slug("-".join(translit(text, 'ru', reversed=True).lower().split()))[:200]
+
+
+class SyntheticGenerator(BatchWriter):
+    """
+    Генерация и запись синтетических данных. Отчёт о записи - stats и report(),
+    как у BulkLoader.
+    """
+
+    def __init__(self, blogs=1000, users=10000, authors=2000, tags=500, entries=100000, comments=1000000,
+                 max_depth=50, seed=42, batch_size=5000, now=REFERENCE_NOW):
+        super().__init__(batch_size)
+        if entries and not (blogs and authors and users and tags):
+            raise ValueError("Для статей нужны блоги, авторы и теги")
+        if comments and not (entries and users):
+            raise ValueError("Для комментариев нужны статьи и пользователи")
+        self.volumes = {"blogs": blogs, "users": users, "authors": min(authors, users), "tags": tags,
+                        "entries": entries, "comments": comments}
+        self.max_depth = max_depth
+        self.rng = random.Random(seed)
+        self.fake = Faker("ru")
+        self.fake.seed_instance(seed)
+        self.now = now.replace(microsecond=0)
+
+        self.words = [self.fake.word() for _ in range(POOL_SIZE)]
+        self.sentences = [self.fake.sentence(nb_words=6)[:-1] for _ in range(POOL_SIZE)]
+        self.paragraphs = [self.fake.paragraph(nb_sentences=5) for _ in range(POOL_SIZE)]
+        self.slugs = [slugify(sentence) for sentence in self.sentences]
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(max_id=Max("id"))["max_id"] or 0) + 1
+
+    def _write(self, model, rows, after_batch=None):
+        """
+        Запись генератора строк пачками, в stats - одна строка на таблицу (время
+        только записи, без генерации). after_batch() вызывается после записи каждой пачки.
+        """
+        count, seconds, batch = 0, 0, []
+
+        def flush():
+            nonlocal count, seconds
+            t_start = time()
+            model.objects.bulk_create(batch)
+            seconds += time() - t_start
+            count += len(batch)
+            batch.clear()
+            if after_batch:
+                after_batch()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+        self.stats.append((model._meta.db_table, count, seconds))
+
+    def pick(self, pool):
+        return pool[self.rng.randrange(len(pool))]
+
+    def generate_blogs(self):
+        start = self._next_id(Blog)
+        self.blog_ids = range(start, start + self.volumes["blogs"])
+        self._write(Blog, (Blog(id=blog_id, name=f"{self.pick(self.words).capitalize()} {blog_id}",
+                                slug_name=f"blog-{blog_id}", headline=self.pick(self.sentences),
+                                description=self.pick(self.paragraphs))
+                           for blog_id in self.blog_ids))
+
+    def generate_users(self):
+        start = self._next_id(User)
+        self.user_ids = range(start, start + self.volumes["users"])
+        password = make_password(None)  # Непригодный для входа пароль, без затрат на хеширование
+        self._write(User, (User(id=user_id, username=f"{self.fake.user_name()}_{user_id}",
+                                email=f"user{user_id}@example.com", password=password,
+                                first_name=self.fake.first_name(), last_name=self.fake.last_name())
+                           for user_id in self.user_ids))
+
+        start = self._next_id(AuthorProfile)
+        self.author_ids = range(start, start + self.volumes["authors"])
+        self._write(AuthorProfile, (AuthorProfile(id=author_id, user_id=user_id, bio=self.pick(self.paragraphs))
+                                    for author_id, user_id in zip(self.author_ids, self.user_ids)))
+
+    def generate_tags(self):
+        start = self._next_id(Tag)
+        self.tag_ids = range(start, start + self.volumes["tags"])
+        self._write(Tag, (Tag(id=tag_id, name=f"{self.pick(self.words)} {tag_id}"[:50], slug_name=f"tag-{tag_id}")
+                          for tag_id in self.tag_ids))
+
+    def generate_entries(self):
+        # Число комментариев каждой статьи (с перекосом в сторону первых статей)
+        self.comment_counts = [0] * self.volumes["entries"]
+        if self.volumes["entries"]:
+            for _ in range(self.volumes["comments"]):
+                self.comment_counts[skewed(self.rng, self.volumes["entries"], power=4)] += 1
+
+        start = self._next_id(Entry)
+        self.entry_ids = range(start, start + self.volumes["entries"])
+        authors_through, tags_through = Entry.authors.through, Entry.tags.through
+        entry_authors, entry_tags = [], []
+        links = {authors_through: [0, 0], tags_through: [0, 0]}  # Число строк и время записи
+
+        def entries():
+            for entry_id in self.entry_ids:
+                sentence = self.rng.randrange(len(self.sentences))
+                status = self.rng.choices((Entry.PUBLISHED, Entry.SCHEDULED, Entry.DRAFT), (90, 5, 5))[0]
+                pub_date = self.now - timedelta(seconds=self.rng.randrange(PUB_DATE_DAYS * 86400))
+                if status == Entry.SCHEDULED:
+                    pub_date = self.now + timedelta(days=self.rng.randrange(1, 30))
+                authors = {self.author_ids[skewed(self.rng, len(self.author_ids))]
+                           for _ in range(min(1 + int(self.rng.expovariate(1.5)), 5))}
+                tags = {self.tag_ids[skewed(self.rng, len(self.tag_ids))] for _ in range(self.rng.randint(1, 6))}
+                entry_authors.extend(authors_through(entry_id=entry_id, authorprofile_id=author_id)
+                                     for author_id in authors)
+                entry_tags.extend(tags_through(entry_id=entry_id, tag_id=tag_id) for tag_id in tags)
+                yield Entry(id=entry_id, blog_id=self.blog_ids[skewed(self.rng, len(self.blog_ids), power=2)],
+                            headline=self.sentences[sentence], slug_headline=f"{self.slugs[sentence]}-{entry_id}",
+                            summary=self.pick(self.paragraphs),
+                            body_text="\n".join(f"<p>{self.pick(self.paragraphs)}</p>" for _ in range(5)),
+                            pub_date=pub_date, status=status, number_of_pingbacks=skewed(self.rng, 100),
+                            rating=round(self.rng.uniform(0, 5), 1))
+
+        def write_links():
+            # Строки промежуточных таблиц пишутся вслед за каждой пачкой статей, не накапливаясь
+            for model, rows in ((authors_through, entry_authors), (tags_through, entry_tags)):
+                t_start = time()
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+                links[model][0] += len(rows)
+                links[model][1] += time() - t_start
+                rows.clear()
+
+        self._write(Entry, entries(), after_batch=write_links)
+        self.stats.extend((model._meta.db_table, count, seconds) for model, (count, seconds) in links.items())
+
+    def generate_comments(self):
+        next_id = self._next_id(Comment)
+
+        def comments():
+            nonlocal next_id
+            for entry_id, count in zip(self.entry_ids, self.comment_counts):
+                thread = []  # (id, глубина) комментариев текущей статьи
+                for _ in range(count):
+                    parent_id, depth, chance = None, 0, self.rng.random()
+                    if thread and chance < REPLY_TO_LAST + REPLY_TO_ANY:
+                        parent = thread[-1] if chance < REPLY_TO_LAST else self.pick(thread)
+                        if parent[1] + 1 < self.max_depth:
+                            parent_id, depth = parent[0], parent[1] + 1
+                    thread.append((next_id, depth))
+                    yield Comment(id=next_id, entry_id=entry_id, parent_id=parent_id,
+                                  user_id=self.user_ids[skewed(self.rng, len(self.user_ids), power=2)],
+                                  text=self.pick(self.sentences))
+                    next_id += 1
+
+        self._write(Comment, comments())
+
+    def generate(self):
+        """Генерация всех данных в одной транзакции. Возвращает stats"""
+        with transaction.atomic():
+            self.generate_blogs()
+            self.generate_users()
+            self.generate_tags()
+            self.generate_entries()
+            self.generate_comments()
+
+            # После записи с явными id счётчики последовательностей нужно сдвинуть (PostgreSQL)
+            models = [Blog, User, AuthorProfile, Tag, Entry, Comment]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+            t_start = time()
+            recount_comment_counters()
+            self.stats.append(("пересчёт счётчиков комментариев", len(self.entry_ids), time() - t_start))
+            if self.volumes["entries"]:  # У всех статей картинка по умолчанию
+                schedule_renditions(Entry._meta.get_field("image").default, ENTRY_RENDITIONS)
+        invalidate_sidebar()
+        invalidate_pages()
+        return self.stats
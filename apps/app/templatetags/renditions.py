@@ -0,0 +1,25 @@
+from django import template
+
+from apps.app.images import rendition_url, rendition_supported
+
+register = template.Library()
+
+
+@register.filter
+def rendition(file, name):
+    """
+    URL уменьшенной копии картинки (images.RENDITIONS) без обращения к диску; если
+    копии такого формата не создаются - URL оригинала.
+    Пример: {{ entry.image|rendition:"card" }}
+    """
+    if not file:
+        return ""
+    return rendition_url(file.name, name) if rendition_supported(name) else file.url
+
+
+@register.filter
+def rendition_or_empty(file, name):
+    """URL копии или пустая строка, если копии такого формата не создаются (для необязательных <source> в <picture>)"""
+    if not file or not rendition_supported(name):
+        return ""
+    return rendition_url(file.name, name)
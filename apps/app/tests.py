@@ -1,3 +1,1081 @@
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.uploadedfile import TemporaryUploadedFile, SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile, File
+from django.test.client import encode_multipart, BOUNDARY, MULTIPART_CONTENT, RequestFactory
+import os
+import re
+import asyncio
+from unittest import skipUnless
+import json
+import time
+from io import StringIO, BytesIO
+from unittest import mock
+from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from django.urls import reverse
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from .models import Blog, AuthorProfile, Entry, Tag, Comment, UserProfile
+from .checks import check_page_cache_backend
+from .cache import SIDEBAR_VERSION_KEY, PAGES_VERSION_KEY
+from .pagination import KeysetPaginator, InvalidCursor, encode_cursor
+from .services import get_comment_tree, get_comment_threads_page
+from .uploads import parse_form_data
+from .images import rendition_name, make_renditions, rendition_storage
+from .templatetags.renditions import rendition, rendition_or_empty
+from .storage import content_hash
+from .seeding import BulkLoader
+from .synthetic import SyntheticGenerator
+from .provisioning import provision_users, hash_passwords
+from .credentials import append_users, read_users
+from apps.db_train_alternative.models import Author as ApiAuthor
+from project.budgets import BudgetTestMixin
+from project import profiling
+from project.loadtest import read_scenarios, build_plan, session_cookies, run, WsgiTransport
+from project.db_routing import PrimaryReplicaRouter, use_primary, use_replica, routing_context, PIN_COOKIE
+from .fixture_stream import iter_json_array, import_fixture, export_fixture, get_models
 
-# Create your tests here.
+
+def create_entries(blog, authors, tags, count, start=0):
+    """Создание count статей в блоге blog с авторами authors и тегами tags"""
+    entries = []
+    for index in range(start, start + count):
+        entry = Entry.objects.create(blog=blog,
+                                     headline=f"Статья {index}",
+                                     slug_headline=f"entry-{index}",
+                                     summary=f"Краткое описание {index}",
+                                     number_of_comments=index)
+        entry.authors.set(authors)
+        entry.tags.set(tags)
+        entries.append(entry)
+    return entries
+
+
+class IndexViewQueryTestCase(TestCase):
+    # Блоги, 5 обсуждаемых, 5 свежих, COUNT(*) пагинатора, статьи страницы,
+    # авторы, теги статей и облако тегов (блоги и облако тегов - при пустом кеше)
+    INDEX_QUERIES = 8
+
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.authors = [AuthorProfile.objects.create(user=User.objects.create(username=f"author{index}"))
+                        for index in range(3)]
+        self.tags = [Tag.objects.create(name=f"Тег {index}", slug_name=f"tag-{index}") for index in range(3)]
+
+    def test_index_num_queries_does_not_depend_on_entries(self):
+        create_entries(self.blog, self.authors, self.tags, 3)
+        with self.assertNumQueries(self.INDEX_QUERIES):
+            response = self.client.get(reverse('app:index'))
+        self.assertEqual(response.status_code, 200)
+
+        create_entries(self.blog, self.authors, self.tags, 30, start=3)
+        with self.assertNumQueries(self.INDEX_QUERIES):
+            response = self.client.get(reverse('app:index'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.authors[0].user.username)
+        self.assertContains(response, self.tags[0].name)
+
+    def test_index_out_of_range_page(self):
+        create_entries(self.blog, self.authors, self.tags, 7)
+        with self.assertNumQueries(self.INDEX_QUERIES):
+            response = self.client.get(reverse('app:index'), {'page': 9999})
+        self.assertEqual(response.context["entryes"].number, 3)
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.author = AuthorProfile.objects.create(user=User.objects.create(username="author"))
+        pub_date = timezone.now()
+        for index in range(7):
+            # Пары статей с одинаковой датой, чтобы проверить порядок по id
+            Entry.objects.create(blog=self.blog, headline=f"Статья {index}", slug_headline=f"entry-{index}",
+                                 summary="", pub_date=pub_date - timezone.timedelta(days=index // 2))
+        for index in range(7, 9):  # Черновики без даты публикации
+            Entry.objects.create(blog=self.blog, headline=f"Статья {index}", slug_headline=f"entry-{index}",
+                                 summary="", status=Entry.DRAFT)
+
+    def test_walk_forward_and_backward(self):
+        expected = [entry.id for entry in Entry.objects.order_by('-pub_date', '-id')]
+        paginator = KeysetPaginator(Entry.objects.all(), 2)
+        pages, page = [], paginator.page()
+        self.assertFalse(page.has_previous())
+        while True:
+            pages.append([entry.id for entry in page])
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(sum(pages, []), expected)
+
+        # Обратный проход с последней страницы возвращает те же страницы
+        back_pages = [[entry.id for entry in page]]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            back_pages.append([entry.id for entry in page])
+        self.assertEqual(back_pages[::-1], pages)
+
+    def test_deep_page_has_no_count_and_offset(self):
+        paginator = KeysetPaginator(Entry.objects.all(), 2)
+        cursor = encode_cursor("n", None, Entry.objects.filter(pub_date__isnull=True).order_by('id').last().id)
+        with self.assertNumQueries(1) as context:
+            page = paginator.page(cursor)
+        sql = context.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertEqual(len(page), 1)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Entry.objects.all(), 2).page("not-a-cursor")
+        response = self.client.get(reverse('app:entry-post'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_entry_json_list(self):
+        response = self.client.get(reverse('app:entry-post'), {'page_size': 5})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['previous'])
+        response = self.client.get(reverse('app:entry-post'), {'page_size': 5, 'cursor': data['next']})
+        data = response.json()
+        self.assertEqual(len(data['results']), 4)
+        self.assertIsNone(data['next'])
+
+    def test_index_and_blog_cursor_mode(self):
+        with self.assertNumQueries(IndexViewQueryTestCase.INDEX_QUERIES - 1):  # Без COUNT(*)
+            response = self.client.get(reverse('app:index'), {'cursor': ''})
+        self.assertTrue(response.context['entryes'].has_next())
+        response = self.client.get(reverse('app:blog', args=[self.blog.slug_name]),
+                                   {'cursor': response.context['entryes'].next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['entryes'].has_previous())
+
+
+class CommentTreeTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", slug_headline="entry", summary="")
+        self.users = [User.objects.create(username=f"user{index}") for index in range(3)]
+        # Профили создаются через bulk_create, чтобы не обрабатывать аватар по умолчанию
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in self.users[:2]])
+
+    def create_thread(self, depth):
+        """Ветка из depth вложенных друг в друга комментариев"""
+        parent = None
+        for level in range(depth):
+            parent = Comment.objects.create(user=self.users[level % 3], entry=self.entry,
+                                            text=f"Уровень {level}", parent=parent)
+
+    def test_tree_arbitrary_depth_in_one_query(self):
+        self.create_thread(5)
+        self.create_thread(2)
+        with self.assertNumQueries(1):
+            roots = get_comment_tree(self.entry)
+            self.assertEqual(len(roots), 2)
+            node, depth = roots[0], 0
+            while node.replies:
+                node, depth = node.replies[0], depth + 1
+                self.assertEqual(node.depth, depth)
+                # Пользователь и профиль (или его отсутствие) уже загружены - без запросов
+                self.assertEqual(hasattr(node.user, "user_profile"), node.user in self.users[:2])
+            self.assertEqual(depth, 4)
+
+    def test_threads_page_num_queries(self):
+        for _ in range(3):
+            self.create_thread(4)
+        with self.assertNumQueries(3):  # COUNT(*), ветки страницы, ответы
+            page = get_comment_threads_page(self.entry, 2, per_page=2)
+        self.assertEqual(len(page.object_list), 1)
+        self.assertEqual(page.object_list[0].replies[0].replies[0].replies[0].text, "Уровень 3")
+
+    def test_post_detail_num_queries_does_not_depend_on_comments(self):
+        url = reverse('app:post-detail', args=[self.entry.slug_headline])
+        self.create_thread(3)
+        self.client.get(url)  # Заполнение кеша sidebar
+        with self.assertNumQueries(7) as context:
+            response = self.client.get(url)
+        self.assertContains(response, "Уровень 2")
+        for _ in range(5):
+            self.create_thread(6)
+        with self.assertNumQueries(len(context.captured_queries)):
+            response = self.client.get(url)
+        self.assertContains(response, "Уровень 5")
+
+    def test_post_detail_deep_thread(self):
+        # Шаблон выводит ветку плоским списком: глубина не ограничена глубиной рекурсии шаблонов
+        Comment.objects.bulk_create([Comment(id=index + 1, user=self.users[0], entry=self.entry,
+                                             text=f"Уровень {index}", parent_id=index or None)
+                                     for index in range(500)])
+        response = self.client.get(reverse('app:post-detail', args=[self.entry.slug_headline]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Уровень 499")
+        self.assertContains(response, 'class="replied"', count=499)
+
+
+class CommentCountersTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", slug_headline="entry", summary="")
+        self.user = User.objects.create(username="user")
+
+    def test_counters_on_create_and_delete(self):
+        root = Comment.objects.create(user=self.user, entry=self.entry, text="Корень")
+        reply = Comment.objects.create(user=self.user, entry=self.entry, text="Ответ", parent=root)
+        Comment.objects.create(user=self.user, entry=self.entry, text="Ответ на ответ", parent=reply)
+        self.entry.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 3)
+        self.assertEqual(root.number_of_replies, 1)
+
+        reply.delete()  # Каскадно удаляется и ответ на ответ
+        self.entry.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 1)
+        self.assertEqual(root.number_of_replies, 0)
+
+    def create_chain(self, depth, parent=None):
+        for level in range(depth):
+            parent = Comment.objects.create(user=self.user, entry=self.entry, text=f"Уровень {level}", parent=parent)
+        return parent
+
+    def test_thread_delete_updates_counters_once(self):
+        other = Comment.objects.create(user=self.user, entry=self.entry, text="Другая ветка")
+        root = Comment.objects.create(user=self.user, entry=self.entry, text="Корень", parent=other)
+        self.create_chain(30, parent=root)
+        with CaptureQueriesContext(connection) as queries:
+            root.delete()
+        # Родитель корня и пересчёт статьи, независимо от числа ответов в ветке
+        self.assertEqual(len([query for query in queries.captured_queries if query["sql"].startswith("UPDATE")]), 2)
+        self.entry.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 1)
+        self.assertEqual(other.number_of_replies, 0)
+
+    def test_queryset_delete_updates_counters(self):
+        root = Comment.objects.create(user=self.user, entry=self.entry, text="Корень")
+        Comment.objects.create(user=self.user, entry=self.entry, text="Ответ", parent=root)
+        Comment.objects.filter(parent=root).delete()
+        self.entry.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 1)
+        self.assertEqual(root.number_of_replies, 0)
+
+    def test_post_comment_updates_counter(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('app:post-detail', args=[self.entry.slug_headline]), {'text': "Комментарий"})
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 1)
+
+    def test_recount_command(self):
+        root = Comment.objects.create(user=self.user, entry=self.entry, text="Корень")
+        Comment.objects.bulk_create([Comment(user=self.user, entry=self.entry, text="Ответ", parent=root)
+                                     for _ in range(4)])  # bulk_create не отправляет сигналы
+        Entry.objects.update(number_of_comments=100)
+        cache.set(SIDEBAR_VERSION_KEY, 1)
+        pages_version = cache.get(PAGES_VERSION_KEY)
+        with self.assertNumQueries(4):  # SAVEPOINT, UPDATE статей, UPDATE комментариев, RELEASE
+            call_command('recount_comments', stdout=StringIO())
+        self.entry.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(self.entry.number_of_comments, 5)
+        self.assertEqual(root.number_of_replies, 4)
+        # Кеши со старыми счётчиками больше не используются
+        self.assertEqual(cache.get(SIDEBAR_VERSION_KEY), 2)
+        self.assertNotEqual(cache.get(PAGES_VERSION_KEY), pages_version)
+
+
+class SidebarCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.other_blog = Blog.objects.create(name="Кулинария", slug_name="cooking")
+        self.tag = Tag.objects.create(name="Горы", slug_name="mountains")
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", slug_headline="entry", summary="")
+        self.entry.tags.add(self.tag)
+
+    def test_sidebar_served_from_cache(self):
+        url = reverse('app:blog', args=[self.blog.slug_name])
+        with self.assertNumQueries(7) as context:  # Блог, 3 поста, статьи страницы, авторы, теги + блоги и теги блога
+            self.client.get(url)
+        with self.assertNumQueries(len(context.captured_queries) - 2):
+            response = self.client.get(url)
+        self.assertEqual([blog['name'] for blog in response.context['blogs']], [self.other_blog.name])
+        self.assertEqual([tag['name'] for tag in response.context['blog_tags']], [self.tag.name])
+
+    def test_sidebar_invalidation(self):
+        url = reverse('app:post-detail', args=[self.entry.slug_headline])
+        self.client.get(url)
+        new_tag = Tag.objects.create(name="Море", slug_name="sea")
+        self.entry.tags.add(new_tag)
+        Blog.objects.create(name="Спорт", slug_name="sport")
+        response = self.client.get(url)
+        self.assertEqual({tag['name'] for tag in response.context['blog_tags']}, {self.tag.name, new_tag.name})
+        self.assertEqual(len(response.context['blogs']), 3)
+        self.entry.tags.remove(self.tag)
+        response = self.client.get(url)
+        self.assertEqual([tag['name'] for tag in response.context['blog_tags']], [new_tag.name])
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE=True)
+class AnonymousPageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", slug_headline="entry", summary="")
+        self.user = User.objects.create(username="user")
+
+    def test_page_served_from_cache_and_not_modified(self):
+        url = reverse('app:post-detail', args=[self.entry.slug_headline])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_content_change_invalidates_pages(self):
+        url = reverse('app:post-detail', args=[self.entry.slug_headline])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(user=self.user, entry=self.entry, text="Новый комментарий")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "Новый комментарий")
+
+    def test_pages_cached_per_url(self):
+        Entry.objects.create(blog=self.blog, headline="Статья 2", slug_headline="entry-2", summary="")
+        Entry.objects.create(blog=self.blog, headline="Статья 3", slug_headline="entry-3", summary="")
+        Entry.objects.create(blog=self.blog, headline="Статья 4", slug_headline="entry-4", summary="")
+        first = self.client.get(reverse('app:index'))
+        second = self.client.get(reverse('app:index'), {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        self.assertEqual(self.client.get(reverse('app:index'), {'page': 2}).content, second.content)
+
+    def test_authenticated_user_not_cached(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('app:blog', args=[self.blog.slug_name]))
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_validators_stable_without_changes(self):
+        # Версия страниц не истекает: без изменений контента ETag тот же и после вытеснения самих страниц
+        url = reverse('app:post-detail', args=[self.entry.slug_headline])
+        etag = self.client.get(url)['ETag']
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + 24 * 60 * 60):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_shared_cache_required(self):
+        self.assertEqual([error.id for error in check_page_cache_backend(None)], ["app.E001"])
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                  'LOCATION': '/tmp/blog-cache'}}
+        with override_settings(CACHES=file_cache):
+            self.assertEqual(check_page_cache_backend(None), [])
+        with override_settings(ANONYMOUS_PAGE_CACHE=False):
+            self.assertEqual(check_page_cache_backend(None), [])
+
+
+def make_image(name="image.png", size=(50, 50)):
+    """Картинка PNG в памяти для загрузки через форму"""
+    buffer = BytesIO()
+    Image.new("RGB", size, color="red").save(buffer, format="PNG")
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class EntryJsonUpdateTestCase(TestCase):
+    def setUp(self):
+        self.media = TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings_override.enable()
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.author = AuthorProfile.objects.create(user=User.objects.create(username="author"))
+        self.tag = Tag.objects.create(name="Горы", slug_name="mountains")
+        self.entry = Entry.objects.create(blog=self.blog, headline="Статья", slug_headline="entry", summary="Кратко")
+        self.entry.authors.add(self.author)
+        self.entry.tags.add(self.tag)
+        self.url = reverse('app:entry', args=[self.entry.id])
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def test_put_with_image(self):
+        data = {'blog': self.blog.id, 'headline': "Новый заголовок", 'summary': "Новое описание",
+                'authors': [self.author.id], 'tags': [self.tag.id], 'status': Entry.PUBLISHED,
+                'image': make_image()}
+        response = self.client.put(self.url, encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.headline, "Новый заголовок")
+        self.assertRegex(self.entry.image.name, r"^image_entry/[0-9a-f]{64}\.png$")
+
+    def test_patch_changes_only_passed_fields(self):
+        response = self.client.patch(self.url, encode_multipart(BOUNDARY, {'headline': "Другой заголовок"}),
+                                     content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.headline, "Другой заголовок")
+        self.assertEqual(self.entry.summary, "Кратко")
+        self.assertEqual(list(self.entry.tags.all()), [self.tag])
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_large_file_spooled_to_disk(self):
+        body = encode_multipart(BOUNDARY, {'headline': "Заголовок", 'image': make_image(size=(300, 300))})
+        request = RequestFactory().put(self.url, body, content_type=MULTIPART_CONTENT)
+        data, files = parse_form_data(request)
+        self.assertEqual(data['headline'], "Заголовок")
+        self.assertIsInstance(files['image'], TemporaryUploadedFile)
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_upload_size_limit(self):
+        body = encode_multipart(BOUNDARY, {'headline': "Заголовок", 'image': make_image(size=(300, 300))})
+        response = self.client.patch(self.url, body, content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 400)
+
+
+class ImageRenditionsTestCase(TestCase):
+    def setUp(self):
+        self.media = TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name, IMAGE_RENDITIONS_ASYNC=False)
+        self.settings_override.enable()
+        self.user = User.objects.create(username="user")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def upload(self, name, size):
+        return SimpleUploadedFile(name, make_image(name, size).getvalue(), content_type="image/png")
+
+    def test_avatar_thumbnail_created_without_touching_original(self):
+        profile = UserProfile.objects.create(user=self.user, avatar=self.upload("avatar.png", (500, 300)))
+        with default_storage.open(rendition_name(profile.avatar.name, "thumb")) as file:
+            self.assertEqual(Image.open(file).size, (200, 120))
+        with default_storage.open(profile.avatar.name) as file:
+            self.assertEqual(Image.open(file).size, (500, 300))
+
+    def test_unchanged_avatar_not_processed(self):
+        profile = UserProfile.objects.create(user=self.user, avatar=self.upload("avatar.png", (500, 300)))
+        profile = UserProfile.objects.get(pk=profile.pk)
+        profile.city = "Москва"
+        with mock.patch("apps.app.models.schedule_renditions") as schedule:
+            profile.save()
+        schedule.assert_not_called()
+
+        profile.avatar = self.upload("other.png", (300, 300))
+        with mock.patch("apps.app.models.schedule_renditions") as schedule:
+            profile.save()
+        schedule.assert_called_once()
+
+    def test_entry_renditions_and_filter(self):
+        blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        entry = Entry.objects.create(blog=blog, headline="Статья", slug_headline="entry",
+                                     image=self.upload("entry.png", (2000, 1000)))
+        with default_storage.open(rendition_name(entry.image.name, "card")) as file:
+            self.assertEqual(Image.open(file).size, (800, 400))
+        self.assertTrue(rendition(entry.image, "full").endswith("/full.png"))
+        self.assertEqual(make_renditions(entry.image.name, ["card"]), [])  # Повторно не создаётся
+
+    def test_filter_does_not_touch_disk(self):
+        avatar = UserProfile(avatar="avatars/raw.png").avatar
+        with mock.patch.object(rendition_storage, "exists") as exists:
+            url = rendition(avatar, "thumb")
+        exists.assert_not_called()
+        self.assertEqual(url, rendition_storage.url("renditions/avatars/raw/thumb.png"))
+
+    def test_filter_without_webp_support(self):
+        entry_image = Entry(image="image_entry/raw.png").image
+        with mock.patch("apps.app.templatetags.renditions.rendition_supported", return_value=False):
+            self.assertEqual(rendition(entry_image, "card_webp"), entry_image.url)
+            self.assertEqual(rendition_or_empty(entry_image, "card_webp"), "")
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.media = TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def test_same_content_stored_once(self):
+        content = make_image().getvalue()
+        first = default_storage.save("avatars/a.png", ContentFile(content))
+        second = default_storage.save("avatars/b.PNG", ContentFile(content))
+        self.assertEqual(first, second)
+        self.assertEqual(first, f"avatars/{content_hash(ContentFile(content))}.png")
+        self.assertEqual(default_storage.listdir("avatars")[1], [os.path.basename(first)])
+
+    def test_local_file_hardlinked(self):
+        source = os.path.join(self.media.name, "source.png")
+        with open(source, "wb") as file:
+            file.write(make_image().getvalue())
+        with open(source, "rb") as file:
+            name = default_storage.save("avatars/source.png", File(file))
+        self.assertTrue(os.path.samefile(source, default_storage.path(name)))
+
+    def test_same_avatar_upload_keeps_name(self):
+        profile = UserProfile.objects.create(user=User.objects.create(username="user"))
+        content = make_image().getvalue()
+        profile.avatar.save("avatar.png", ContentFile(content))
+        profile = UserProfile.objects.get(pk=profile.pk)
+        with mock.patch("apps.app.models.schedule_renditions") as schedule:
+            profile.avatar.save("avatar_copy.png", ContentFile(content))
+        schedule.assert_not_called()  # Файл не изменился - копии не пересоздаются
+
+
+class BulkLoaderTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.users = [User.objects.create(username=f"user{i}") for i in range(3)]
+        for user in self.users[:2]:
+            AuthorProfile.objects.create(user=user)
+
+    def make_data(self, count):
+        tags = [{"name": f"Тег {i}", "slug_name": f"tag-{i}"} for i in range(3)]
+        entries = [{"blog": "Путешествия", "headline": f"Статья {i}", "slug_headline": None,
+                    "summary": "Кратко", "body_text": "Текст", "image": "image_entry/1.jpg",
+                    "pub_date": f"2023-01-{i % 28 + 1:02d} 10:00:00",
+                    "authors_id": [user.id for user in self.users[:2]], "number_of_comments": 0,
+                    "number_of_pingbacks": 0, "rating": None, "tags": ["Тег 0", "Тег 1"]}
+                   for i in range(count)]
+        comments = [{"user_id": self.users[2].id, "entry": "Статья 0", "text": "Ответ на ответ", "parent_id": 2},
+                    {"user_id": self.users[2].id, "entry": "Статья 0", "text": "Ответ", "parent_id": 3},
+                    {"user_id": self.users[0].id, "entry": "Статья 0", "text": "Комментарий"}]
+        comments += [{"user_id": self.users[0].id, "entry": f"Статья {i}", "text": "Комментарий"}
+                     for i in range(count)]
+        return tags, entries, comments
+
+    def test_load(self):
+        tags, entries, comments = self.make_data(5)
+        loader = BulkLoader(batch_size=2)
+        loader.load(tags=tags, entries=entries, comments=comments)
+
+        entry = Entry.objects.get(headline="Статья 0")
+        self.assertEqual(entry.slug_headline, "statja-0")
+        self.assertEqual(entry.authors.count(), 2)
+        self.assertEqual(list(entry.tags.values_list("name", flat=True)), ["Тег 0", "Тег 1"])
+        self.assertEqual(entry.number_of_comments, 4)
+        deepest = Comment.objects.get(text="Ответ на ответ")
+        self.assertEqual(deepest.parent.text, "Ответ")
+        self.assertEqual(deepest.parent.parent.text, "Комментарий")
+        self.assertEqual(deepest.parent.parent.number_of_replies, 1)
+        self.assertEqual([row[:2] for row in loader.stats[:3]],
+                         [("app_tag", 3), ("app_entry", 5), ("app_entry_authors", 10)])
+
+    def test_query_count_does_not_depend_on_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            BulkLoader(batch_size=1000).load(*self.make_data(5))
+        Entry.objects.all().delete()
+        Tag.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            BulkLoader(batch_size=1000).load(*self.make_data(50))
+        self.assertEqual(len(small), len(large))
+
+    def test_unknown_blog(self):
+        tags, entries, comments = self.make_data(1)
+        entries[0]["blog"] = "Нет такого"
+        with self.assertRaisesMessage(ValueError, "Нет блога с названием: 'Нет такого'"):
+            BulkLoader().load(tags=tags, entries=entries)
+        self.assertFalse(Tag.objects.exists())  # Транзакция откатилась целиком
+
+    def test_duplicate_headline(self):
+        Blog.objects.create(name="Кино", slug_name="cinema")
+        tags, entries, comments = self.make_data(2)
+        entries.append(dict(entries[0], blog="Кино"))
+        comments = [{"user_id": self.users[0].id, "entry": "Статья 0", "text": "Комментарий"}]
+        with self.assertRaisesMessage(ValueError, "Несколько статей (2) с ключом 'Статья 0'"):
+            BulkLoader().load(tags=tags, entries=entries, comments=comments)
+
+        comments[0]["blog"] = "Кино"
+        BulkLoader().load(tags=tags, entries=entries, comments=comments)
+        self.assertEqual(Comment.objects.get().entry.blog.name, "Кино")
+
+
+class ProvisionUsersTestCase(TestCase):
+    def test_bulk_users_with_fast_profile(self):
+        data = [{"username": f"user{i}", "email": f"user{i}@example.com", "password": f"secret-{i}"}
+                for i in range(5)]
+        with self.assertNumQueries(3):  # SAVEPOINT, INSERT пачки, RELEASE SAVEPOINT
+            users = provision_users(data, profile="fast", processes=1, is_staff=True)
+        self.assertEqual([user.username for user in users], [item["username"] for item in data])
+        user = User.objects.get(username="user3")
+        self.assertTrue(user.is_staff)
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(user.check_password("secret-3"))  # Проверяется обычными настройками
+
+    def test_process_pool_keeps_order(self):
+        hashes = list(hash_passwords(["a", "b", "c"], profile="fast", processes=2))
+        self.assertEqual(len(hashes), 3)
+        self.assertTrue(all(check_password(password, encoded) for password, encoded in zip("abc", hashes)))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            list(hash_passwords(["a"], profile="md4"))
+
+
+class CredentialsStoreTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "users.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_read(self):
+        self.assertEqual(list(read_users(self.path)), [])
+        append_users([{"username": "user1", "password": "пароль"}], path=self.path)
+        append_users([{"username": "user2", "password": "2"}], path=self.path)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"username": "broken"')  # Прерванная запись
+        self.assertEqual([user["username"] for user in read_users(self.path)], ["user1", "user2"])
+
+    def test_parallel_appends(self):
+        batches = [[{"username": f"user{i}-{j}", "password": "x" * 1000} for j in range(50)] for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda batch: append_users(batch, path=self.path), batches))
+        users = list(read_users(self.path))
+        self.assertEqual(len(users), 400)
+        self.assertEqual({user["username"] for user in users},
+                         {user["username"] for batch in batches for user in batch})
+
+
+class FixtureStreamTestCase(TestCase):
+    def test_iter_json_array_small_blocks(self):
+        text = '[{"a": "x,]"}, 12345, [1, 2], {"b": {"c": null}}]'
+        self.assertEqual(list(iter_json_array(StringIO(text), read_size=3)), json.loads(text))
+
+    def test_import_and_export_round_trip(self):
+        with open(os.path.join(settings.BASE_DIR, "data_db.json"), encoding="utf-8") as stream:
+            loaded = import_fixture(stream, batch_size=10)
+        self.assertEqual(loaded["app.comment"], 134)
+        self.assertEqual(Entry.objects.count(), 25)
+        entry = Entry.objects.order_by("id").first()
+        self.assertTrue(entry.authors.exists())
+
+        output = StringIO()
+        with self.assertNumQueries(len(get_models(["app"])) + 2):  # Выборка на модель и на каждое поле m2m статей
+            total = export_fixture(output, labels=["app"], batch_size=1000)
+        exported = json.loads(output.getvalue())
+        self.assertEqual(total, len(exported))
+        expected = [item for item in json.load(open(os.path.join(settings.BASE_DIR, "data_db.json"),
+                                                     encoding="utf-8")) if item["model"].startswith("app.")]
+        key = lambda item: (item["model"], item["pk"])
+        self.assertEqual({key(item): item["fields"].get("tags") for item in exported if item["model"] == "app.entry"},
+                         {key(item): item["fields"].get("tags") for item in expected if item["model"] == "app.entry"})
+
+        # Повторная загрузка выгрузки перезаписывает объекты по pk
+        Entry.objects.update(headline="изменено")
+        output.seek(0)
+        import_fixture(output)
+        self.assertEqual(Entry.objects.count(), 25)
+        self.assertFalse(Entry.objects.filter(headline="изменено").exists())
+
+    @override_settings(ANONYMOUS_PAGE_CACHE=True)
+    def test_import_recounts_and_invalidates_pages(self):
+        cache.clear()
+        blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        create_entries(blog, [], [], 1, start=5)  # number_of_comments=5 без комментариев
+        output = StringIO()
+        export_fixture(output, labels=["app.blog", "app.entry"])
+        Entry.objects.all().delete()
+
+        self.assertNotContains(self.client.get(reverse('app:index')), "Статья 5")  # Страница в кеше
+        output.seek(0)
+        import_fixture(output)
+        self.assertContains(self.client.get(reverse('app:index')), "Статья 5")
+        self.assertEqual(Entry.objects.get().number_of_comments, 0)
+
+
+@override_settings(DATABASE_REPLICAS=["default"])
+class ReplicaRoutingTestCase(TestCase):
+    """Роль реплики играет default, вызов выбора реплики отслеживается через random.choice"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+
+    def test_router_rules(self):
+        with routing_context(), mock.patch("project.db_routing.random.choice", return_value="replica1"):
+            self.assertEqual(self.router.db_for_read(Entry), "default")
+            with use_replica():
+                self.assertEqual(self.router.db_for_read(Entry), "replica1")
+                self.assertEqual(self.router.db_for_read(User), "default")
+                self.assertEqual(self.router.db_for_read(Session), "default")
+                with use_primary():
+                    self.assertEqual(self.router.db_for_read(Entry), "default")
+                self.assertEqual(self.router.db_for_write(Entry), "default")
+                self.assertEqual(self.router.db_for_read(Entry), "default")  # После записи - только default
+        self.assertFalse(self.router.allow_migrate("replica1", "app"))
+
+    def test_list_pages_read_from_replica(self):
+        with mock.patch("project.db_routing.random.choice", return_value="default") as choice:
+            response = self.client.get(reverse('app:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(choice.called)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def get_routed(self, url):
+        """Ответ и список (приложение, БД), которые роутер выбрал бы при отдельной реплике (запросы идут в default)"""
+        routed = []
+        db_for_read = PrimaryReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            with mock.patch("project.db_routing.random.choice", return_value="replica1"):
+                routed.append((model._meta.app_label, db_for_read(router, model, **hints)))
+            return "default"
+
+        with mock.patch.object(PrimaryReplicaRouter, "db_for_read", spy):
+            return self.client.get(url), routed
+
+    def test_logged_in_user_read_from_default(self):
+        user = User.objects.create_user(username="user", password="password")
+        self.client.force_login(user)
+        response, routed = self.get_routed(reverse('app:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user"], user)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)  # Сессия не удалена
+        self.assertIn(("app", "replica1"), routed)
+        self.assertEqual({label for label, db in routed if db == "replica1"}, {"app"})
+        self.assertTrue({"sessions", "auth"} <= {label for label, db in routed})
+
+    @override_settings(ANONYMOUS_PAGE_CACHE=True)
+    def test_caches_filled_from_default(self):
+        # Страница и фрагменты sidebar, попадающие в кеш, читаются только из default
+        Blog.objects.create(name="Путешествия", slug_name="travel")
+        response, routed = self.get_routed(reverse('app:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(routed)
+        self.assertNotIn("replica1", {db for label, db in routed})
+
+    def test_request_pinned_after_write(self):
+        blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        entry = Entry.objects.create(blog=blog, headline="Статья", slug_headline="entry", summary="Кратко")
+        user = User.objects.create_user(username="user", password="password")
+        self.client.force_login(user)
+        response = self.client.post(reverse('app:post-detail', args=[entry.slug_headline]), {'text': "Комментарий"})
+        self.assertEqual(entry.comments.count(), 1)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with mock.patch("project.db_routing.random.choice", return_value="default") as choice:
+            self.client.get(reverse('app:index'))  # cookie закрепления отправляется обратно
+        self.assertFalse(choice.called)
+
+
+class SqliteProductionProfileTestCase(SimpleTestCase):
+    def connect(self, directory):
+        wrapper = connection.copy()
+        wrapper.settings_dict = {**wrapper.settings_dict, "NAME": os.path.join(directory, "db.sqlite3")}
+        wrapper.ensure_connection()  # Сигнал connection_created
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            return {name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                    for name in ("journal_mode", "synchronous", "temp_store", "busy_timeout")}
+
+    def test_pragmas_applied_to_new_connections(self):
+        with TemporaryDirectory() as directory, override_settings(SQLITE_PRODUCTION=True):
+            pragmas = self.connect(directory)
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "temp_store": 2, "busy_timeout": 20000})
+
+    def test_default_profile_unchanged(self):
+        with TemporaryDirectory() as directory, override_settings(SQLITE_PRODUCTION=False):
+            self.assertEqual(self.connect(directory)["journal_mode"], "delete")
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN есть только в SQLite")
+class QueryPlanTestCase(TestCase):
+    """Запросы страниц не должны читать таблицы целиком (кроме небольших справочников)"""
+    # Блоги, теги и профили авторов целиком выводятся в списках выбора формы статьи и в sidebar
+    FULL_SCAN_ALLOWED = {"app_blog", "app_tag", "app_authorprofile"}
+
+    def setUp(self):
+        cache.clear()
+        blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.user = User.objects.create_user(username="author", password="password")
+        self.user.user_permissions.add(Permission.objects.get(codename="can_add_entry"))
+        author = AuthorProfile.objects.create(user=self.user)
+        tag = Tag.objects.create(name="Горы", slug_name="mountains")
+        self.entries = create_entries(blog, [author], [tag], 12)
+        for entry in self.entries[:3]:
+            comment = Comment.objects.create(user=self.user, entry=entry, text="Комментарий")
+            Comment.objects.create(user=self.user, entry=entry, text="Ответ", parent=comment)
+
+    def full_scans(self, queries):
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query["sql"]
+                if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                # Обход результата рекурсивного CTE (и его псевдонимов) - это не чтение таблицы
+                ctes = set(re.findall(r"(\w+)\s*\(\w+\)\s+AS\s*\(", sql))
+                ctes |= {alias for cte in ctes for alias in re.findall(rf"\b{cte}\s+(\w+)\s+ON\b", sql)}
+                for row in cursor.fetchall():
+                    match = re.match(r"SCAN (\w+)$", row[3])
+                    if match and match.group(1) not in self.FULL_SCAN_ALLOWED | ctes:
+                        scans.append(f"{row[3]}: {sql}")
+        return scans
+
+    def test_views_do_not_scan_tables(self):
+        self.client.force_login(self.user)
+        urls = [reverse('app:index'), reverse('app:index') + '?page=2', reverse('app:index') + '?cursor=',
+                reverse('app:blog', args=['travel']),
+                reverse('app:post-detail', args=[self.entries[0].slug_headline]),
+                reverse('app:entry-post'), reverse('app:entry', args=[self.entries[0].id]),
+                reverse('app:personal-account')]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertEqual(self.full_scans(queries.captured_queries), [])
+
+    def test_author_entries_by_status_start_from_author(self):
+        # Личный кабинет: статьи автора по статусу - поиск по автору в Entry.authors, а не по всем статьям статуса
+        for status in (Entry.PUBLISHED, Entry.SCHEDULED, Entry.DRAFT):
+            with self.subTest(status=status):
+                sql, params = AuthorProfile.objects.get(user=self.user).entrys.filter(status=status) \
+                    .query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                    plan = [row[3] for row in cursor.fetchall()]
+                self.assertRegex(plan[0], r"^SEARCH app_entry_authors USING .*\(authorprofile_id=\?\)$")
+                self.assertIn("SEARCH app_entry USING INTEGER PRIMARY KEY (rowid=?)", plan)
+
+
+class PerformanceBudgetTestCase(BudgetTestMixin, TestCase):
+    """Число запросов и p95 времени ответа страниц блога (project/budgets.py) на большом наборе данных"""
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticGenerator(blogs=20, users=300, authors=50, tags=40, entries=2000, comments=5000).generate()
+        # Первые блог, автор и статьи - самые популярные (см. apps/app/synthetic.py)
+        cls.blog = Blog.objects.order_by("id").first()
+        cls.user = AuthorProfile.objects.order_by("id").first().user
+        cls.user.user_permissions.add(Permission.objects.get(codename="can_add_entry"))
+        cls.entry = Entry.objects.order_by("-number_of_comments").first()
+
+    def test_index(self):
+        self.assertWithinBudget('app:index')
+        self.assertWithinBudget('app:index', data={'page': 50})
+
+    def test_blog(self):
+        self.assertWithinBudget('app:blog', kwargs={'name': self.blog.slug_name})
+
+    def test_post_detail(self):
+        self.assertWithinBudget('app:post-detail', kwargs={'slug': self.entry.slug_headline})
+
+    def test_about(self):
+        self.assertWithinBudget('app:about')
+
+    def test_personal_account(self):
+        self.client.force_login(self.user)
+        self.assertWithinBudget('app:personal-account')
+
+    def test_entry(self):
+        self.assertWithinBudget('app:entry', kwargs={'id': self.entry.id})
+
+    def test_entry_list(self):
+        self.assertWithinBudget('app:entry-post')
+
+
+class SyntheticGeneratorTestCase(TestCase):
+    VOLUMES = {"blogs": 3, "users": 20, "authors": 5, "tags": 6, "entries": 30, "comments": 400}
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        """Данные относительно первых id, чтобы сравнивать запуски генератора"""
+        blog_start = Blog.objects.order_by("id").first().id
+        entry_start = Entry.objects.order_by("id").first().id
+        comment_start = Comment.objects.order_by("id").first().id
+        entries = [(headline, blog_id - blog_start, number_of_comments, pub_date)
+                   for headline, blog_id, number_of_comments, pub_date in Entry.objects.order_by("id")
+                   .values_list("headline", "blog_id", "number_of_comments", "pub_date")]
+        comments = [(entry_id - entry_start, parent_id and parent_id - comment_start, text)
+                    for entry_id, parent_id, text in Comment.objects.order_by("id")
+                    .values_list("entry_id", "parent_id", "text")]
+        return entries, comments
+
+    def test_volumes_and_counters(self):
+        generator = SyntheticGenerator(max_depth=4, batch_size=50, **self.VOLUMES)
+        generator.generate()
+        self.assertEqual(Blog.objects.count(), 3)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(AuthorProfile.objects.count(), 5)
+        self.assertEqual(Entry.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertFalse(Entry.objects.filter(authors=None).exists())
+        self.assertFalse(Entry.objects.filter(tags=None).exists())
+        self.assertEqual(sum(Entry.objects.values_list("number_of_comments", flat=True)), 400)
+        # Ответ всегда в той же статье, что и родитель, глубина не больше max_depth
+        for comment in Comment.objects.filter(parent__isnull=False).select_related("parent"):
+            self.assertEqual(comment.entry_id, comment.parent.entry_id)
+        self.assertTrue(Comment.objects.filter(parent__parent__parent__isnull=False).exists())
+        self.assertFalse(Comment.objects.filter(parent__parent__parent__parent__isnull=False).exists())
+        self.assertEqual([row[:2] for row in generator.stats[:2]], [("app_blog", 3), ("auth_user", 20)])
+
+    def test_deterministic(self):
+        SyntheticGenerator(seed=7, **self.VOLUMES).generate()
+        first = self.snapshot()
+        Comment.objects.all().delete()
+        Entry.objects.all().delete()
+        Blog.objects.all().delete()
+        SyntheticGenerator(seed=7, **self.VOLUMES).generate()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_missing_volumes(self):
+        with self.assertRaises(ValueError):
+            SyntheticGenerator(blogs=0, entries=10)
+
+    def test_now_option(self):
+        call_command("generate_dataset", "--blogs=1", "--users=2", "--authors=1", "--tags=1", "--entries=5",
+                     "--comments=0", "--now=2020-06-01T12:00:00+00:00", stdout=StringIO())
+        now = timezone.datetime(2020, 6, 1, 12, tzinfo=timezone.utc)
+        self.assertFalse(Entry.objects.filter(status=Entry.PUBLISHED, pub_date__gt=now).exists())
+        self.assertTrue(Entry.objects.filter(pub_date__gt=now - timezone.timedelta(days=5 * 365)).exists())
+
+
+class LoadTestHarnessTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        self.user = User.objects.create_user(username="author", password="password")
+        create_entries(blog, [AuthorProfile.objects.create(user=self.user)], [], 5)
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "scenarios.jsonl")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"name": "app:index", "weight": 3}\n'
+                    '# Комментарий\n'
+                    '\n'
+                    '{"name": "app:post-detail", "method": "POST", "label": "comment", '
+                    '"kwargs": {"slug": "@app.Entry.slug_headline"}, "data": {"text": "Привет"}, '
+                    '"user": "author", "weight": 1}\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_plan_is_reproducible(self):
+        scenarios = read_scenarios(self.path)
+        self.assertEqual([scenario.label for scenario in scenarios], ["app:index", "comment"])
+        plan = build_plan(scenarios, 200, seed=1)
+        self.assertEqual(plan, build_plan(scenarios, 200, seed=1))
+        self.assertNotEqual(plan, build_plan(scenarios, 200, seed=2))
+        comments = [planned for planned in plan if planned.label == "comment"]
+        self.assertTrue(30 < len(comments) < 70)
+        self.assertTrue({planned.path for planned in comments} <= {
+            reverse('app:post-detail', args=[entry.slug_headline]) for entry in Entry.objects.all()})
+        self.assertEqual(comments[0].body, "text=%D0%9F%D1%80%D0%B8%D0%B2%D0%B5%D1%82".encode())
+
+    def test_wsgi_transport_with_session_and_csrf(self):
+        entry = Entry.objects.first()
+        session = session_cookies(["author"])["author"]
+        token = "a" * 32
+        headers = {"Cookie": f"{settings.CSRF_COOKIE_NAME}={token}; {settings.SESSION_COOKIE_NAME}={session}",
+                   "Content-Type": "application/x-www-form-urlencoded"}
+        transport = WsgiTransport(1, "testserver")
+        try:
+            path = reverse('app:post-detail', args=[entry.slug_headline])
+            self.assertEqual(transport.call("POST", path, headers, b"text=Hi"), 403)  # Без CSRF-токена
+            headers["X-CSRFToken"] = token
+            self.assertEqual(transport.call("POST", path, headers, b"text=Hi"), 302)
+            self.assertEqual(transport.call("GET", reverse('app:about'), {}, b""), 200)
+        finally:
+            transport.close()
+        self.assertEqual(Comment.objects.get(entry=entry).user, self.user)
+
+    def test_run_collects_stats(self):
+        class Transport:
+            async def request(self, method, path, headers, body):
+                if path == "/broken/":
+                    raise ConnectionError("reset")
+                return 404 if path == "/missing/" else 200
+
+        plan = build_plan(read_scenarios(self.path)[:1], 5)
+        plan += [plan[0]._replace(label="missing", path="/missing/"), plan[0]._replace(label="broken", path="/broken/")]
+        stats = asyncio.run(run(plan, Transport(), concurrency=3))
+        self.assertEqual({label: len(timings) for label, timings in stats.timings.items()},
+                         {"app:index": 5, "missing": 1, "broken": 1})
+        self.assertEqual(dict(stats.errors), {"missing": 1, "broken": 1})
+        self.assertIn("ConnectionError", stats.last_error["broken"])
+        self.assertTrue(stats.report()[-1].startswith("Всего"))
+
+
+@override_settings(PROFILING_TOKEN="secret", PROFILING_SAMPLE_RATE=0)
+class ProfilingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling.stats.snapshot(reset=True)
+        self.blog = Blog.objects.create(name="Путешествия", slug_name="travel")
+        create_entries(self.blog, [], [], 3)
+
+    def test_profile_by_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('app:index'), HTTP_X_PROFILE="secret")
+        self.assertIn('sql;dur=', response["Server-Timing"])
+        self.assertIn(f'desc="SQL ({len(queries)})"', response["Server-Timing"])
+        row = profiling.stats.snapshot()["views"]["app:index"]
+        self.assertEqual(row["requests"], 1)
+        self.assertEqual(row["sql_count"], len(queries))
+        self.assertGreater(row["avg_template_time_ms"], 0)
+        self.assertEqual(row["avg_serializer_time_ms"], 0)
+        self.assertGreaterEqual(row["avg_total_time_ms"], row["avg_template_time_ms"])
+
+        # Без заголовка (и с неверным токеном) запрос не профилируется
+        self.assertFalse(self.client.get(reverse('app:index')).has_header("Server-Timing"))
+        self.assertFalse(self.client.get(reverse('app:index'), HTTP_X_PROFILE="wrong").has_header("Server-Timing"))
+        self.assertEqual(profiling.stats.snapshot()["views"]["app:index"]["requests"], 1)
+
+    def test_serializer_time(self):
+        ApiAuthor.objects.bulk_create([ApiAuthor(name=f"Автор {i}", email=f"author{i}@example.com")
+                                       for i in range(500)])
+        self.client.force_login(User.objects.create_user(username="reader"))
+        # Быстрый путь списка (apps/api/values.py) и обычные сериализаторы DRF (?extended=true)
+        for data in ({"page_size": 500}, {"page_size": 500, "extended": "true"}):
+            profiling.stats.snapshot(reset=True)
+            self.client.get(reverse('authors-viewset-list'), data, HTTP_X_PROFILE="secret")
+            self.assertGreater(profiling.stats.snapshot()["views"]["authors-viewset-list"]["avg_serializer_time_ms"],
+                               0, data)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sample_rate(self):
+        self.assertTrue(self.client.get(reverse('app:about')).has_header("Server-Timing"))
+
+    def test_stats_endpoint(self):
+        self.client.get(reverse('app:about'), HTTP_X_PROFILE="secret")
+        self.assertEqual(self.client.get(reverse('profiling-stats')).status_code, 403)
+        response = self.client.get(reverse('profiling-stats'), {"reset": "1"}, HTTP_X_PROFILE="secret")
+        self.assertEqual(response.json()["views"]["app:about"]["requests"], 1)
+        self.assertNotIn("app:about", profiling.stats.snapshot()["views"])
+
+    def test_flush_to_file(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.jsonl")
+            with self.settings(PROFILING_FILE=path, PROFILING_FLUSH_SECONDS=0):
+                self.client.get(reverse('app:about'), HTTP_X_PROFILE="secret")
+                self.client.get(reverse('app:about'), HTTP_X_PROFILE="secret")
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual([line["views"]["app:about"]["requests"] for line in lines], [1, 1])
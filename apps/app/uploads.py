@@ -0,0 +1,57 @@
+"""
+Потоковый разбор тела PUT/PATCH запросов с формой (multipart/form-data).
+
+Django сам разбирает тело только для POST, поэтому раньше EntryJson.put читал
+request.body целиком и делил его на части вручную - тело запроса с картинкой
+копировалось в памяти несколько раз. Здесь используется тот же потоковый
+MultiPartParser, что и для POST: тело читается из сокета кусками, а файлы
+проходят через обработчики загрузки из настроек (FILE_UPLOAD_HANDLERS):
+небольшие (до FILE_UPLOAD_MAX_MEMORY_SIZE) остаются в памяти, большие сразу
+пишутся во временный файл на диске.
+"""
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import QueryDict
+from django.http.multipartparser import MultiPartParser, MultiPartParserError
+from django.utils.datastructures import MultiValueDict
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """
+    Ограничивает суммарный размер файлов в одном запросе (UPLOAD_MAX_SIZE).
+    Ставится первым в цепочке обработчиков и передаёт данные дальше без копирования.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.UPLOAD_MAX_SIZE
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_size:  # Отклоняем заранее по заголовку Content-Length
+            raise RequestDataTooBig("Размер загружаемых данных превышает допустимый")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            raise RequestDataTooBig("Размер загружаемых файлов превышает допустимый")
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None  # Файл собирает следующий обработчик в цепочке
+
+
+def parse_form_data(request):
+    """
+    Возвращает (data, files) тела запроса любого метода, аналогично request.POST и request.FILES.
+    Поддерживаются multipart/form-data (потоково) и application/x-www-form-urlencoded.
+    Ошибки формата - MultiPartParserError, превышение размера - RequestDataTooBig.
+    """
+    if request.content_type == 'multipart/form-data':
+        handlers = [UploadSizeLimitHandler(request)] + request.upload_handlers
+        return MultiPartParser(request.META, request, handlers, request.encoding).parse()
+    if request.content_type == 'application/x-www-form-urlencoded':
+        return QueryDict(request.body, encoding=request.encoding), MultiValueDict()
+    raise MultiPartParserError(f"Неподдерживаемый Content-Type: {request.content_type}")
@@ -2,55 +2,44 @@ import time
 
 from django.shortcuts import render, get_object_or_404, resolve_url, redirect
 from django.http import JsonResponse, QueryDict
-from django.utils.datastructures import MultiValueDict
 from django.views.generic import View, TemplateView, DetailView, CreateView, FormView
-from .models import Blog, Entry, Tag, Comment, AuthorProfile
+from .models import Blog, Entry, Comment, AuthorProfile
 from .forms import CommentForm, CustomUserCreationForm, EntryForm
+from .services import get_index_context, get_blog_entries_page, entry_card_queryset, prefetch_entry_cards, \
+    get_comment_threads_page
+from .pagination import InvalidCursor, KeysetPaginator
+from .cache import get_blogs, get_blog_tags
+from .mixins import AnonymousPageCacheMixin, ReplicaReadMixin
+from .uploads import parse_form_data
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.db.models import F
 from django.views.decorators.csrf import csrf_exempt
 import json
 from django.utils.decorators import method_decorator
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import io
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http.multipartparser import MultiPartParserError
+from django.db import transaction
+from project.db_routing import use_replica
 
 
-class IndexView(View):
+class IndexView(ReplicaReadMixin, AnonymousPageCacheMixin, View):
     def get(self, request):
-        blogs = Blog.objects.all()
-        all_entryes = Entry.objects.all().prefetch_related("authors").select_related("blog")  # Получить все записи с
-        # предварительно загруженными отношениям по авторам и блогу
-        most_entryes = all_entryes.order_by('-number_of_comments')[:5]  # Получить последние 5 статей по числу комментариев
-        fresh_entryes = all_entryes[:5]  # Получить последние 5 статей по дате
-        tags = Tag.objects.all()[:10]  # Получить 10 тегов
+        page = request.GET.get('page')  # по умолчанию передаётся page в параметрах запроса, чтобы понять на какой мы сейчас странице
+        cursor = request.GET.get('cursor')  # курсор для курсорной пагинации
+        # Все данные страницы (статьи с авторами, тегами и блогами, облако тегов)
+        # собираются за фиксированное число запросов, подробнее в services.get_index_context
+        context = get_index_context(page, cursor=cursor,
+                                    keyset=settings.KEYSET_PAGINATION or cursor is not None)
 
-        # Применение пагинации, для реализации постраничного вывода
+        return render(request, 'app/index.html', context=context)
 
-        paginator = Paginator(all_entryes, 3)  # Показывать по 3 статей на странице. Можно передать параметр пользователь сам решит сколько ему покажется
-        page = request.GET.get('page')  # по умолчанию передаётся page в параметрах запроса, чтобы понять на какой мы сейчас странице
-        try:
-            entryes = paginator.page(page)
-        except PageNotAnInteger:
-            # Если страница не является целым числом, показать первую страницу.
-            entryes = paginator.page(1)
-        except EmptyPage:
-            # Если страница выходит за пределы допустимого диапазона (например, 9999), показать последнюю страницу результатов.
-            entryes = paginator.page(paginator.num_pages)
-
-        return render(request, 'app/index.html', context={"blogs": blogs,
-                                                          "most_entryes": most_entryes,
-                                                          "entryes": entryes,
-                                                          "fresh_entryes": fresh_entryes,
-                                                          "tags": tags,
-                                                          })
-
-
-class BlogView(TemplateView):
+
+class BlogView(ReplicaReadMixin, AnonymousPageCacheMixin, TemplateView):
     template_name = 'app/blog.html'
 
     def get_context_data(self, **kwargs):
@@ -58,18 +47,21 @@ class BlogView(TemplateView):
 
         # Аналог blog = Blog.objects.get(slug_name=kwargs["name"])
         blog = get_object_or_404(Blog, slug_name=kwargs["name"])  # Если в БД не было найдено объекта, то возвращается ошибка 404
-        blogs = Blog.objects.exclude(id=blog.id)
+        # Список блогов и теги блога берутся из кеша (cache.py), инвалидируется при изменении блогов, статей и тегов
+        blogs = [item for item in get_blogs() if item['id'] != blog.id]
         resent_posts = blog.entryes.all()[:3]  # Вывести последние 3 поста
         # Добавление данных блога в контекст под ключом 'blog', 'resent_posts'
         context['blog'] = blog
         context['blogs'] = blogs
-        context["blog_tags"] = Tag.objects.filter(entry__blog=blog).distinct()
+        context["blog_tags"] = get_blog_tags(blog.id)
         context['resent_posts'] = resent_posts
+        # Статьи блога с курсорной пагинацией (стоимость любой страницы одинакова)
+        context['entryes'] = get_blog_entries_page(blog, cursor=self.request.GET.get('cursor'))
 
         return context
 
 
-class PostDetailView(DetailView):
+class PostDetailView(AnonymousPageCacheMixin, DetailView):
     model = Entry  # модель, которая будет браться за основу. В шаблоне можно получить данные из названия модели
     # с маленькой буквы (entry)
     slug_field = "slug_headline"  # Для идентификации объекта по полю slug передаём название поля slug из БД
@@ -84,12 +76,25 @@ class PostDetailView(DetailView):
     # это суффикс у шаблона с префиксом по умолчанию '_detail') в нашем случае это будет
     # `app/entry_detail.html`, тогда template_name можно не прописывать, он сам возьмёт его
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("blog")
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Авторы (с пользователями) и теги статьи - по одному запросу
+        prefetch_entry_cards([context['entry']])
 
         context["blog_entryes"] = self.get_queryset().filter(blog=context['entry'].blog).exclude(id=context['entry'].id)
-        context["blogs"] = Blog.objects.values('name', 'slug_name')
-        context["blog_tags"] = Tag.objects.filter(entry__blog=context['entry'].blog).distinct()
+        # Список блогов и теги блога берутся из кеша (cache.py)
+        context["blogs"] = get_blogs()
+        context["blog_tags"] = get_blog_tags(context['entry'].blog_id)
+        # Ветки комментариев с ответами любой глубины, пользователями и аватарами
+        # загружаются за фиксированное число запросов (services.get_comment_threads_page)
+        context["comment_threads"] = get_comment_threads_page(context['entry'], self.request.GET.get('comments_page'))
+        # Отвечать на комментарии могут авторы статьи и персонал сайта (проверяется один раз на страницу)
+        user = self.request.user
+        context["can_reply"] = user.is_staff or (user.is_authenticated and
+                                                 context['entry'].authors.filter(user=user).exists())
 
         return context
 
@@ -100,7 +105,9 @@ class PostDetailView(DetailView):
             entry = self.get_object()
             text = form.cleaned_data.get('text')
             parent = form.cleaned_data.get('parent')
-            Comment.objects.create(user=user, entry=entry, text=text, parent=parent)
+            # Комментарий и обновление счётчиков (signals.py) в одной транзакции
+            with transaction.atomic():
+                Comment.objects.create(user=user, entry=entry, text=text, parent=parent)
 
         return redirect('app:post-detail', slug=kwargs["slug"])
 
@@ -117,7 +124,8 @@ class PersonalAccountView(LoginRequiredMixin, PermissionRequiredMixin, TemplateV
         #     raise PermissionDenied(self.permission_denied_message)
         profile_author = get_object_or_404(AuthorProfile, user=self.request.user)  # Проверяем что есть профиль автора
         entries = profile_author.entrys.all()
-        comments = Comment.objects.filter(entry__in=entries).filter(parent__isnull=True).order_by('-created_at')[:5]
+        comments = Comment.objects.filter(entry__in=entries).filter(parent__isnull=True)\
+            .select_related('entry').order_by('-created_at')[:5]
         context["profile_author"] = profile_author
         context["entries_published"] = entries.filter(status="published")
         context["entries_scheduled"] = entries.filter(status="scheduled")
@@ -205,7 +213,13 @@ class LogoutView(View):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class EntryJson(View):
-    def get(self, request, id):
+    page_size = 10  # Размер страницы списка статей по умолчанию
+    max_page_size = 100  # Максимальный размер страницы, который может запросить клиент
+
+    def get(self, request, id=None):
+        if id is None:  # Без id возвращаем список статей (из реплики БД, если они настроены)
+            with use_replica():
+                return self.get_list(request)
         entry = Entry.objects.filter(id=id)
         if entry:
             entry = entry.first()
@@ -227,6 +241,37 @@ class EntryJson(View):
                             json_dumps_params={"ensure_ascii": False,
                                                "indent": 4})
 
+    def get_list(self, request):
+        """
+        Список статей с курсорной пагинацией по (pub_date, id).
+        В ответе next/previous - непрозрачные курсоры соседних страниц,
+        которые передаются обратно в параметре ?cursor=
+        """
+        try:
+            page_size = min(int(request.GET.get('page_size', self.page_size)), self.max_page_size)
+            page = KeysetPaginator(entry_card_queryset(), max(page_size, 1)).page(request.GET.get('cursor'))
+        except (InvalidCursor, ValueError):
+            return JsonResponse({"message": "Некорректные параметры пагинации"}, status=400,
+                                json_dumps_params={"ensure_ascii": False,
+                                                   "indent": 4})
+        prefetch_entry_cards(page.object_list)  # Авторы и теги для всей страницы за 2 запроса
+        results = [{"entry_id": entry.id,
+                    "blog_name": entry.blog.name,
+                    "headline": entry.headline,
+                    "summary": entry.summary,
+                    "image": entry.image.url,
+                    "pub_date": entry.pub_date,
+                    "status": entry.status,
+                    "authors": [{"user_id": author.user_id, "name": author.user.username}
+                                for author in entry.authors.all()],
+                    "tags": [{"id": tag.id, "name": tag.name} for tag in entry.tags.all()],
+                    } for entry in page]
+        return JsonResponse({"results": results,
+                             "next": page.next_cursor,
+                             "previous": page.previous_cursor},
+                            json_dumps_params={"ensure_ascii": False,
+                                               "indent": 4})
+
     def post(self, request):
         form = EntryForm(request.POST, request.FILES)
         if form.is_valid():
@@ -252,53 +297,42 @@ class EntryJson(View):
                                                "indent": 4})
 
     def put(self, request, id):
-        # form = EntryForm(request.POST, request.FILES)
-        # Получите данные из PUT-запроса
-        put_data = request.body
-        boundary = request.content_params["boundary"]
-        parts = put_data.split(boundary.encode())
-        # Преобразуйте данные в словарь JSON
-        # data_dict = json.loads(put_data)
-
-        data_dict = MultiValueDict()
-        data_dict_file = MultiValueDict()
-
-        for part in parts:
-            if b'Content-Disposition: form-data' in part:
-                # Если часть содержит данные формы
-                headers, body = part.split(b'\r\n\r\n', 1)
-                name = headers.split(b'name="')[1].split(b'"')[0].decode('utf-8')
-                if name != 'image':
-                    value = body.strip(b'\r\n--').decode('utf-8')
-                    data_dict.appendlist(name, value)
-                else:
-                    filename, content_type = headers.split(b'filename="')[1].split(b'"')
-                    if filename:
-                        filename, content_type = filename.decode("utf-8"), content_type.split(b': ')[-1].decode("utf-8")
-                        file_data = body.strip(b'\r\n')
-                        file_io = io.BytesIO(file_data)
-                        image_file = InMemoryUploadedFile(file_io, None, filename, content_type, len(file_data), None)
-                        data_dict_file.appendlist(name, image_file)
-
-
-        # Создайте экземпляр формы и передайте данные
-        form = EntryForm(data_dict, data_dict_file)
-
-        if form.is_valid():
-            # Данные валидны, обработайте их
-            # ...
-            entry = get_object_or_404(Entry, id=id)
-
-            # Обновляем поля экземпляра Entry на основе очищенных данных формы
-            for field in form.cleaned_data.keys():
-                if field not in ['authors', 'tags']:
-                    setattr(entry, field, form.cleaned_data.get(field))
+        return self.update(request, id, partial=False)
+
+    def patch(self, request, id):
+        return self.update(request, id, partial=True)
+
+    def update(self, request, id, partial=False):
+        """
+        Изменение статьи. PUT - все поля формы, PATCH - только переданные поля.
+        Тело запроса разбирается потоково (uploads.parse_form_data): картинка не
+        копируется в память целиком, большие файлы пишутся во временный файл.
+        """
+        entry = get_object_or_404(Entry, id=id)
+        try:
+            data, files = parse_form_data(request)
+        except (MultiPartParserError, RequestDataTooBig) as e:
+            return JsonResponse({"message": f"Некорректные данные запроса: {e}"}, status=400,
+                                json_dumps_params={"ensure_ascii": False,
+                                                   "indent": 4})
 
-            # Сохраняем обновленный экземпляр Entry
-            entry.save()
+        if partial:
+            # Недостающие поля формы заполняем текущими значениями статьи
+            form_data = QueryDict(mutable=True)
+            for field, value in EntryForm(instance=entry).initial.items():
+                if isinstance(value, list):  # Отношения многие-ко-многим
+                    form_data.setlist(field, [getattr(obj, 'pk', obj) for obj in value])
+                elif value is not None:
+                    form_data[field] = value
+            for field in data:
+                form_data.setlist(field, data.getlist(field))
+            data = form_data
+
+        # Форма привязана к статье: если новая картинка не передана, остаётся текущая
+        form = EntryForm(data, files, instance=entry)
 
-            entry.authors.set(form.cleaned_data.get("authors"))
-            entry.tags.set(form.cleaned_data.get("tags"))
+        if form.is_valid():
+            form.save()  # Сохраняет статью и отношения authors, tags
 
             return JsonResponse({'message': 'Данные обработаны успешно'},
                                 status=200,
@@ -0,0 +1,79 @@
+"""
+Сводка ответов страницы тренировки запросов (TrainView) одним снимком.
+
+Каждый ответ считает сама БД (aggregate, annotate, values), в Python попадают
+только строки ответов, а не все авторы:
+    1. агрегат по авторам за один проход: число авторов, число женщин,
+       согласившихся с правилами и указавших телефон (Count(filter=Q(...))),
+       максимум самооценки;
+    2. по запросу на каждый ответ со списком авторов: с наибольшей
+       самооценкой, самый плодовитый (Count по статьям), самый старший, со
+       стажем 1-5 лет, младше 25 лет и число статей каждого автора;
+    3. статьи с тегами 'Кино' или 'Музыка'.
+
+Снимок (списки словарей и чисел) хранится в кеше и удаляется при изменении
+авторов, профилей, статей и тегов (signals.py), поэтому страница в обычном
+режиме - одно чтение из кеша. Возраст считается на текущую дату (ages.py),
+поэтому в ключ снимка входит дата.
+"""
+
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from .models import Author, Entry, author_display
+
+SNAPSHOT_KEY = "train:analytics:{date}"
+SNAPSHOT_TIMEOUT = 60 * 60  # Время жизни снимка, с (на случай изменения данных в обход сигналов)
+TAGS = ['Кино', 'Музыка']
+STAGE_RANGE = (1, 5)
+YOUNG_AGE = 25
+
+NAME_FIELDS = ('username', 'first_name', 'last_name', 'middle_name')  # Поля строки автора (author_display)
+AUTHOR_FIELDS = NAME_FIELDS + ('self_esteem',)
+
+
+def compute_snapshot(today=None):
+    """Ответы на 10 вопросов страницы на дату today: словарь answer1..answer10"""
+    totals = Author.objects.aggregate(
+        total=Count('id'),
+        women=Count('id', filter=Q(gender='ж')),
+        agreed=Count('id', filter=Q(status_rule=True)),
+        with_phone=Count('id', filter=Q(phone_number__isnull=False)),
+        max_self_esteem=Max('self_esteem'),
+    )
+    authors = Author.objects.order_by('pk')
+    top_self_esteem = []
+    if totals['max_self_esteem'] is not None:
+        top_self_esteem = list(authors.filter(self_esteem=totals['max_self_esteem']).values(*AUTHOR_FIELDS))
+    most_entries = Author.objects.annotate(num_entries=Count('entries')).order_by('-num_entries', 'pk') \
+        .values(*AUTHOR_FIELDS, 'num_entries').first()
+    # Самый старший - с самой ранней датой рождения (первый по pk среди равных)
+    oldest = Author.objects.filter(date_birth__isnull=False).order_by('date_birth', 'pk') \
+        .values_list(*NAME_FIELDS).first()
+    return {
+        'answer1': top_self_esteem,
+        'answer2': most_entries,
+        'answer3': list(Entry.objects.filter(tags__name__in=TAGS).distinct().order_by('pk').values('text')),
+        'answer4': totals['women'],
+        'answer5': round(totals['agreed'] * 100 / totals['total'], 2) if totals['total'] else 0,
+        'answer6': list(authors.annotate(stage=Max('authorprofile__stage')).filter(stage__range=STAGE_RANGE)
+                        .values(*AUTHOR_FIELDS, 'stage')),
+        'answer7': author_display(*oldest) if oldest else None,
+        'answer8': totals['with_phone'],
+        'answer9': list(authors.age_lt(YOUNG_AGE, today).with_age(today).values(*AUTHOR_FIELDS, 'current_age')),
+        'answer10': list(authors.annotate(count=Count('entries')).filter(count__gt=0).values('username', 'count')),
+    }
+
+
+def get_snapshot():
+    """Снимок из кеша, при промахе вычисляется и сохраняется"""
+    today = date.today()
+    return cache.get_or_set(SNAPSHOT_KEY.format(date=today), lambda: compute_snapshot(today),
+                            timeout=SNAPSHOT_TIMEOUT)
+
+
+def invalidate_snapshot():
+    """Удаление снимка (вызывается из обработчиков сигналов)"""
+    cache.delete(SNAPSHOT_KEY.format(date=date.today()))
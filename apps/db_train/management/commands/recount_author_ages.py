@@ -0,0 +1,24 @@
+from time import time
+
+from django.core.management.base import BaseCommand
+
+from apps.db_train.ages import CHUNK_SIZE, backfill_ages, recompute_ages
+
+
+class Command(BaseCommand):
+    help = "Пересчёт хранимого возраста авторов db_train (Author.age) по дате рождения: пачками " \
+           "с записью только изменившихся значений или (--single-update) одним UPDATE"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Авторов в пачке")
+        parser.add_argument("--single-update", action="store_true",
+                            help="Один UPDATE с выражением на все строки, без чтения данных")
+
+    def handle(self, *args, **options):
+        t_start = time()
+        if options["single_update"]:
+            message = f"Возраст пересчитан у {backfill_ages()} авторов"
+        else:
+            checked, updated = recompute_ages(chunk_size=options["chunk_size"])
+            message = f"Проверено авторов: {checked}, возраст изменился у {updated}"
+        self.stdout.write(self.style.SUCCESS(f"{message}. Время выполнения: {time() - t_start:.4f} c"))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:50
+
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import Case, ExpressionWrapper, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+
+
+def backfill_ages(apps, schema_editor):
+    # Разовое обновление устаревшего хранимого возраста для уже существующих авторов:
+    # полных лет на сегодня по date_birth (копия выражения на момент миграции, см. apps/db_train/ages.py)
+    Author = apps.get_model('db_train', 'Author')
+    today = date.today()
+    birthday_ahead = (Q(date_birth__month__gt=today.month) |
+                      Q(date_birth__month=today.month, date_birth__day__gt=today.day))
+    age = ExpressionWrapper(
+        Value(today.year) - ExtractYear('date_birth') - Case(When(birthday_ahead, then=Value(1)), default=Value(0)),
+        output_field=IntegerField())
+    Author.objects.filter(date_birth__isnull=False).update(age=age)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db_train', '0005_alter_entry_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='date_birth',
+            field=models.DateField(blank=True, db_index=True, help_text='Посланцев из будущего не регистрируем!', null=True, verbose_name='Дата рождения'),
+        ),
+        migrations.RunPython(backfill_ages, migrations.RunPython.noop),
+    ]
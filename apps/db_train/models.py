@@ -3,6 +3,8 @@ from django.core.validators import RegexValidator, MinValueValidator, MaxValueVa
 # Create your models here.
 from datetime import datetime
 
+from .ages import age_expression, birth_date_bound
+
 
 class AuthorProfile(models.Model):
     author = models.OneToOneField('Author', on_delete=models.CASCADE)
@@ -35,6 +37,36 @@ class Tag(models.Model):
         return self.name
 
 
+class AuthorQuerySet(models.QuerySet):
+    """Запросы по возрасту на текущую дату (ages.py), а не по хранимому age"""
+
+    def with_age(self, today=None):
+        return self.annotate(current_age=age_expression(today))
+
+    def age_lt(self, age, today=None):
+        return self.filter(date_birth__gt=birth_date_bound(age, today))
+
+    def age_gte(self, age, today=None):
+        return self.filter(date_birth__lte=birth_date_bound(age, today))
+
+    def age_range(self, low, high, today=None):
+        """Возраст от low до high лет включительно"""
+        return self.age_gte(low, today).age_lt(high + 1, today)
+
+    def order_by_age(self, descending=False):
+        """Сортировка по возрасту (старше - раньше рождён), авторы без даты рождения - в конце, равные - по pk"""
+        field = models.F('date_birth')
+        return self.order_by(field.asc(nulls_last=True) if descending else field.desc(nulls_last=True), 'pk')
+
+
+def author_display(username, first_name, last_name, middle_name):
+    """Строка автора (Author.__str__) по значениям полей, без объекта модели"""
+    initials = None  # Инициалы
+    if first_name and middle_name:
+        initials = f"{first_name.upper()[0]}.{middle_name.upper()[0]}."
+    return f"{username} - {last_name} {initials}"
+
+
 class Author(models.Model):
     phone_regex = RegexValidator(
         regex=r'^\+79\d{9}$',
@@ -110,12 +142,14 @@ class Author(models.Model):
                            blank=True,
                            )
 
+    # Хранимая копия возраста на дату последнего сохранения (или backfill_ages), в запросах не используется
     age = models.IntegerField(null=True, editable=False)
 
     date_birth = models.DateField(verbose_name='Дата рождения',
                                   help_text="Посланцев из будущего не регистрируем!",
                                   null=True,
                                   blank=True,
+                                  db_index=True,
                                   )
 
     status_rule = models.BooleanField(verbose_name='Согласие с правилами',
@@ -132,11 +166,10 @@ class Author(models.Model):
     create_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
 
+    objects = AuthorQuerySet.as_manager()
+
     def __str__(self):
-        initials = None  # Инициалы
-        if self.first_name and self.middle_name:
-            initials = f"{self.first_name.upper()[0]}.{self.middle_name.upper()[0]}."
-        return f"{self.username} - {self.last_name} {initials}"
+        return author_display(self.username, self.first_name, self.last_name, self.middle_name)
 
     class Meta:
         verbose_name = "Автор"
@@ -0,0 +1,24 @@
+"""
+Обработчики сигналов приложения db_train. Подключаются в DbTrainConfig.ready() (apps.py).
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .analytics import invalidate_snapshot
+from .models import Author, AuthorProfile, Entry, Tag
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=AuthorProfile)
+@receiver(post_delete, sender=AuthorProfile)
+@receiver(post_save, sender=Entry)
+@receiver(post_delete, sender=Entry)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Entry.tags.through)
+def invalidate_analytics_snapshot(sender, action=None, **kwargs):
+    # Для m2m_changed реагируем только на уже выполненные изменения (post_add, post_remove, post_clear)
+    if action is None or action.startswith("post_"):
+        invalidate_snapshot()
@@ -1,3 +1,191 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Max
 from django.test import TestCase
+from django.urls import reverse
+
+from project.budgets import BudgetTestMixin
+from .ages import backfill_ages, birth_date_bound, recompute_ages
+from .analytics import compute_snapshot
+from .models import Author, AuthorProfile, Entry, Tag
+
+
+class PerformanceBudgetTestCase(BudgetTestMixin, TestCase):
+    """Число запросов и p95 времени ответа страницы тренировки запросов (project/budgets.py)"""
+    AUTHORS = 300
+    ENTRIES = 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = Author.objects.bulk_create([
+            Author(username=f"author-{i}", email=f"author{i}@example.com", gender="мж"[i % 2],
+                   self_esteem=i % 6, date_birth=date(1960 + i % 50, 1 + i % 12, 1 + i % 28), status_rule=bool(i % 3),
+                   phone_number=f"+79{i:09d}" if i % 4 else None)
+            for i in range(cls.AUTHORS)])
+        AuthorProfile.objects.bulk_create([AuthorProfile(author=author, stage=i % 10)
+                                           for i, author in enumerate(authors)])
+        tags = Tag.objects.bulk_create([Tag(name=name) for name in ("Кино", "Музыка", "Спорт", "Наука")])
+        entries = Entry.objects.bulk_create([Entry(text=f"Статья {i}", author=authors[i % cls.AUTHORS])
+                                             for i in range(cls.ENTRIES)])
+        Entry.tags.through.objects.bulk_create([Entry.tags.through(entry=entry, tag=tags[i % len(tags)])
+                                                for i, entry in enumerate(entries)])
+
+    def test_train(self):
+        self.assertWithinBudget('train:index')
+
+
+class AnalyticsSnapshotTestCase(TestCase):
+    """Снимок analytics.py совпадает с ответами исходных запросов по одному на вопрос"""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = Author.objects.bulk_create([
+            Author(username=f"author-{i}", email=f"author{i}@example.com", gender=[None, "м", "ж"][i % 3],
+                   first_name="Иван", middle_name="Петрович" if i % 2 else None, last_name=f"Иванов {i}",
+                   self_esteem=[1, 5, None, 3][i % 4],
+                   date_birth=[date(1994 + i % 10, 5, 1 + i % 28), None, date(2000 + i % 7, 12, 31), date(1960, 2, 29)][i % 4],
+                   status_rule=bool(i % 3), phone_number=f"+79{i:09d}" if i % 4 else None)
+            for i in range(40)])
+        AuthorProfile.objects.bulk_create([AuthorProfile(author=author, stage=i % 8)
+                                           for i, author in enumerate(authors) if i % 5])
+        tags = Tag.objects.bulk_create([Tag(name=name) for name in ("Кино", "Музыка", "Спорт")])
+        entries = Entry.objects.bulk_create([Entry(text=f"Статья {i}", author=authors[(i * 7) % 13])
+                                             for i in range(60)])
+        Entry.tags.through.objects.bulk_create([Entry.tags.through(entry=entry, tag=tag)
+                                                for i, entry in enumerate(entries) for tag in tags[:i % 4]])
+
+    def setUp(self):
+        cache.clear()
+
+    SNAPSHOT_QUERIES = 8  # Агрегат по авторам, запрос на каждый ответ со строками
+
+    def test_same_answers(self):
+        with self.assertNumQueries(self.SNAPSHOT_QUERIES):
+            snapshot = compute_snapshot()
+
+        max_self_esteem = Author.objects.aggregate(value=Max('self_esteem'))['value']
+        self.assertEqual([a['username'] for a in snapshot['answer1']],
+                         [a.username for a in Author.objects.filter(self_esteem=max_self_esteem).order_by('pk')])
+        most_entries = Author.objects.annotate(num_entries=Count('entries')).order_by('-num_entries', 'pk').first()
+        self.assertEqual(snapshot['answer2']['username'], most_entries.username)
+        self.assertEqual([e['text'] for e in snapshot['answer3']],
+                         [e.text for e in Entry.objects.filter(tags__name__in=['Кино', 'Музыка']).distinct()
+                          .order_by('pk')])
+        self.assertEqual(snapshot['answer4'], Author.objects.filter(gender='ж').count())
+        self.assertEqual(snapshot['answer5'],
+                         round(Author.objects.filter(status_rule=True).count() * 100 / Author.objects.count(), 2))
+        self.assertEqual([a['username'] for a in snapshot['answer6']],
+                         [a.username for a in Author.objects.filter(authorprofile__stage__range=(1, 5)).order_by('pk')])
+        self.assertEqual(snapshot['answer7'], str(Author.objects.order_by_age(descending=True).first()))
+        self.assertEqual(snapshot['answer8'], Author.objects.filter(phone_number__isnull=False).count())
+        self.assertEqual([a['username'] for a in snapshot['answer9']],
+                         [a.username for a in Author.objects.age_lt(25).order_by('pk')])
+        self.assertEqual(sorted((a['username'], a['count']) for a in snapshot['answer10']),
+                         sorted((a['username'], a['count']) for a in Entry.objects.values('author__username')
+                                .annotate(count=Count('id'), username=F('author__username'))))
+
+    def test_empty(self):
+        Author.objects.all().delete()
+        Tag.objects.all().delete()
+        snapshot = compute_snapshot()
+        self.assertEqual(snapshot['answer5'], 0)
+        self.assertIsNone(snapshot['answer2'])
+        self.assertIsNone(snapshot['answer7'])
+        self.assertEqual(self.client.get(reverse('train:index')).status_code, 200)
+
+    def test_cache_and_invalidation(self):
+        url = reverse('train:index')
+        with self.assertNumQueries(self.SNAPSHOT_QUERIES):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, "author-1<")
+
+        author = Author.objects.get(username="author-1")
+        author.self_esteem = 5
+        author.save()
+        with self.assertNumQueries(self.SNAPSHOT_QUERIES):
+            self.client.get(url)
+
+        AuthorProfile.objects.filter(author=author).delete()
+        with self.assertNumQueries(self.SNAPSHOT_QUERIES):
+            self.client.get(url)
+
+        Entry.objects.create(text="Новая статья", author=author).tags.add(Tag.objects.get(name="Кино"))
+        with self.assertNumQueries(self.SNAPSHOT_QUERIES):
+            response = self.client.get(url)
+        self.assertContains(response, "Новая статья")
+
+
+class AuthorAgeTestCase(TestCase):
+    """Возраст по date_birth на дату запроса (ages.py)"""
+    BIRTHS = [date(2000, 2, 29), date(2000, 3, 1), date(1999, 2, 28), date(1999, 3, 1), date(1990, 12, 31),
+              date(1990, 1, 1), date(2024, 2, 29), date(1985, 6, 15)]
+    DAYS = [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1), date(2023, 2, 28), date(2023, 3, 1),
+            date(2024, 6, 15), date(2024, 12, 31), date(2025, 1, 1)]
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create([Author(username=f"author-{i}", email=f"author{i}@example.com",
+                                           date_birth=birth, status_rule=True)
+                                    for i, birth in enumerate(cls.BIRTHS + [None])])
+
+    @staticmethod
+    def python_age(birth, today):
+        return today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
+
+    def test_expression(self):
+        for today in self.DAYS:
+            ages = dict(Author.objects.with_age(today).values_list("date_birth", "current_age"))
+            self.assertIsNone(ages.pop(None))
+            self.assertEqual(ages, {birth: self.python_age(birth, today) for birth in self.BIRTHS}, today)
+
+    def test_bounds(self):
+        # Фильтры по границам date_birth совпадают с фильтрами по вычисленному возрасту
+        for today in self.DAYS:
+            for age in (0, 1, 24, 25, 34, 39):
+                self.assertEqual(set(Author.objects.age_lt(age, today)),
+                                 set(Author.objects.with_age(today).filter(current_age__lt=age)), (today, age))
+                self.assertEqual(set(Author.objects.age_gte(age, today)),
+                                 set(Author.objects.with_age(today).filter(current_age__gte=age)), (today, age))
+            self.assertEqual(set(Author.objects.age_range(24, 25, today)),
+                             set(Author.objects.with_age(today).filter(current_age__range=(24, 25))), today)
+        self.assertEqual(birth_date_bound(25, date(2024, 2, 29)), date(1999, 2, 28))
+
+    def test_order_by_age(self):
+        self.assertEqual(list(Author.objects.order_by_age(descending=True).values_list("date_birth", flat=True)),
+                         sorted(self.BIRTHS) + [None])
+        self.assertEqual(list(Author.objects.order_by_age().values_list("date_birth", flat=True)),
+                         sorted(self.BIRTHS, reverse=True) + [None])
+
+    def test_backfill(self):
+        Author.objects.update(age=0)
+        today = date(2024, 3, 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(backfill_ages(today=today), len(self.BIRTHS))
+        self.assertEqual(dict(Author.objects.values_list("date_birth", "age")),
+                         {**{birth: self.python_age(birth, today) for birth in self.BIRTHS}, None: 0})
+
+    def test_recompute(self):
+        for today in self.DAYS:
+            Author.objects.update(age=-1)
+            with self.assertNumQueries(7):  # 3 пачки: чтение и UPDATE, последнее чтение пустое
+                checked, updated = recompute_ages(chunk_size=3, today=today)
+            self.assertEqual(checked, len(self.BIRTHS))
+            self.assertEqual(dict(Author.objects.exclude(date_birth=None).values_list("date_birth", "age")),
+                             {birth: self.python_age(birth, today) for birth in self.BIRTHS}, today)
+            # Повторный пересчёт на ту же дату ничего не записывает
+            with self.assertNumQueries(4):
+                self.assertEqual(recompute_ages(chunk_size=3, today=today), (len(self.BIRTHS), 0))
 
-# Create your tests here.
+    def test_index_used(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN - только SQLite")
+        sql, params = Author.objects.age_lt(25).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("date_birth", plan)
+        self.assertNotIn("SCAN", plan.replace("SCAN db_train_author USING INDEX", ""))
@@ -15,8 +15,9 @@ command_migrate = "python manage.py migrate"
 if os.path.exists(DATABASE):
     os.remove(DATABASE)
 
-if os.path.exists("users.json"):
-    os.remove("users.json")
+for users_file in ("users.json", "users.jsonl"):  # users.json - формат прежних версий create_users.py
+    if os.path.exists(users_file):
+        os.remove(users_file)
 
 try:
     subprocess.run(command_make, shell=True, check=True)
@@ -7,7 +7,6 @@ import threading  # Для создания потоков
 from multiprocessing import Pool  # Для создания процессов
 from multiprocessing.pool import ThreadPool  # Для создания пула потоков
 from concurrent.futures import ThreadPoolExecutor  # Для создания пула потоков
-from json import load, dump
 
 from faker import Faker
 
@@ -21,6 +20,8 @@ setup()  # Загрузка настроек Django
 # ______________________________________________________________________________
 
 from django.contrib.auth.models import User  # Загрузка базового пользователя
+from apps.app.provisioning import provision_users
+from apps.app.credentials import append_users
 
 # _____________Блок с созданием пользователей___________________________________
 
@@ -29,16 +30,14 @@ Faker.seed(
     42)  # Фиксируем значение seed, чтобы случайные генерации были воспроизводимы
 
 def write_users(data):
-    """Запись данных пользователей в файл users.json"""
-    if os.path.exists("users.json"):
-        with open("users.json", encoding="utf-8") as f:
-            users = load(f)
-        users += data  # Дозаписываем данные к уже имеющимся
-        with open("users.json", "w", encoding="utf-8") as f:
-            dump(users, f, indent=4)
-    else:
-        with open("users.json", "w", encoding="utf-8") as f:
-            dump(data, f, indent=4)
+    """
+    Дозапись данных пользователей в файл users.jsonl (по строке JSON на
+    пользователя, apps/app/credentials.py). Файл не перечитывается и не
+    перезаписывается целиком, запись под блокировкой, поэтому безопасна для
+    параллельных вызовов из потоков и процессов.
+    Прочитать пользователей: read_users() из apps.app.credentials.
+    """
+    append_users(data)
 
 def get_fake_user():
     return {
@@ -192,6 +191,29 @@ def create_users_with_multiprocessing(num_users=10, num_process=5):
         f"мультипроцессинг равно {time() - t1:.4f} c")
     return results
 
+def create_users_bulk(num_users=10, is_staff=False, profile="default"):
+    """
+    Пакетное создание пользователей (apps/app/provisioning.py): пароли хешируются
+    в пуле процессов по числу ядер, а сами пользователи записываются в БД
+    пачками через bulk_create из основного процесса (процессы пула с БД не работают).
+
+    profile="fast" - упрощённое хеширование для тестовых данных, пароль при
+    первом входе перехешируется с полным числом итераций.
+    """
+    t1 = time()
+    # Имена должны быть уникальны, иначе пачка не запишется целиком
+    data = [{"username": fake.unique.user_name(),
+             "email": fake.free_email(),
+             "password": fake.password()} for _ in range(num_users)]
+
+    provision_users(data, profile=profile, is_staff=is_staff)
+
+    print(f"Время выполнения создания {num_users} пользователей через "
+          f"пакетную запись (хеширование в пуле процессов) равно {time() - t1:.4f} c")
+
+    write_users(data)  # Запись в файл
+
+
 if __name__ == "__main__":
     # _____________Создание пользователей_______________________________________
     # Создание администратора
@@ -213,5 +235,8 @@ if __name__ == "__main__":
     create_users_with_threadpool(10)  # А пулл потоков для этой задачи справился похуже
 
     create_users_with_multiprocessing(10)  # Применение мультипроцессинга,
-    # дало результат хуже, чем с потоками
+    # дало результат хуже, чем с потоками (каждый процесс ещё и пишет в БД по одному)
+
+    create_users_bulk(100)  # В процессах только хеширование, запись пачками -
+    # быстрее всех вариантов выше
 
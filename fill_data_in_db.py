@@ -13,15 +13,13 @@ python manage.py shell
 
 import os
 from time import time
-from datetime import date, datetime
-import re
+from datetime import date
 from json import load, dump
 
 from django.core.exceptions import ValidationError
 from django.core.files import File
-from django.utils import timezone
 from faker import Faker
-from create_users import create_fake_users
+from create_users import create_users_bulk
 
 
 # _____________Для работы с БД в Django через скрипт - этот блок обязателен !___
@@ -32,7 +30,9 @@ setup()  # Загрузка настроек Django
 # ______________________________________________________________________________
 
 from django.contrib.auth.models import User  # Загрузка базового пользователя
-from apps.app.models import Blog, UserProfile, AuthorProfile, Entry, Tag, Comment
+from apps.app.models import Blog, UserProfile, AuthorProfile
+from apps.app.seeding import BulkLoader
+from apps.app.images import wait_renditions
 
 # _____________Чтение данных из json для добавления в БД________________________
 with open("data/json_data/blogs.json", encoding="utf-8") as f:
@@ -55,10 +55,11 @@ if __name__ == "__main__":
     User.objects.create_superuser("admin", password="123")
     print("Админ создан \n    Логин: admin\n    Пароль: 123")
 
-    # Работает долго, хеширование пароля занимает много времени
-    create_fake_users(5, True)  # Создание аккаунта для персонала
+    # Хеширование паролей занимает много времени, поэтому пароли хешируются
+    # в пуле процессов, а пользователи записываются пачкой (create_users.py)
+    create_users_bulk(5, True)  # Создание аккаунта для персонала
 
-    create_fake_users(35, False)  # Создание аккаунта для персонала
+    create_users_bulk(35, False)  # Создание аккаунтов пользователей
 
     print()  # Просто, чтобы сделать отступ в консоли
 
@@ -268,64 +269,31 @@ if __name__ == "__main__":
         f"Записи в таблицу UserProfile созданы, всего {len(data_user_profile)} записей. Время "
         f"выполнения: {result_time:.4f} c")
 
-    ## ______ Работа с объектами таблицы Tag ___________________________________
+    ## ______ Пакетная запись таблиц Tag, Entry, Comment ______________________
+    """Запись по одной строке (Tag.objects.create, Entry.full_clean() + save(),
+    obj.authors.set, Entry.objects.get и User.objects.get на каждый комментарий)
+    выполняет несколько запросов на каждую строку и на больших объёмах занимает часы.
+    BulkLoader (apps/app/seeding.py) заранее загружает ключи связей в словари и
+    записывает строки пачками через bulk_create в одной транзакции: число
+    запросов зависит от числа пачек, а не от числа строк.
+    Счётчики комментариев после записи пересчитываются по фактическим данным.
+
+    Внимание: parent_id в comments.json - это не id комментария в БД, а порядковый
+    номер (с 1) родительского комментария в этом же списке. id комментариев
+    назначает БД при записи, поэтому загрузчик сам подставляет id родителя.
+    Статья комментария ищется по заголовку ("entry"); если заголовок встречается
+    в нескольких блогах, в комментарии нужно указать и название блога ("blog")."""
     t_start = time()
 
-    for tag in data_tag:
-        Tag.objects.create(**tag)
+    loader = BulkLoader()
+    loader.load(tags=data_tag, entries=data_entry, comments=data_comment)
+    for line in loader.report():
+        print(f"    {line}")
 
     result_time = time() - t_start
     print(
-        f"Записи в таблицу Tag созданы, всего {len(data_tag)} записей. Время "
-        f"выполнения: {result_time:.4f} c")
-
-    ## ______ Работа с объектами таблицы Entry _________________________________
-    t_start = time()
-
-    blogs = Blog.objects.all()
-    authors = AuthorProfile.objects.all()
-    tags = Tag.objects.all()
-    re_split = re.compile(r'[ :-]')
-    for entry in data_entry:
-        blog = blogs.get(name=entry["blog"])
-        author = authors.filter(user__id__in=entry["authors_id"])
-        tag = tags.filter(name__in=entry["tags"])
-        # pub_date в моделях объявлен как DateTimeField, поэтому на вход необходимо подавать объект datetime
-        pub_date = datetime(*map(int, re_split.split(entry["pub_date"]))) if \
-            entry["pub_date"] is not None else datetime.now()
-        pub_date = timezone.make_aware(pub_date)  # добавляем данных о часовом поясе, так как могут быть проблемы с БД и Django
-        obj = Entry(blog=blog,
-                    headline=entry["headline"],
-                    slug_headline=entry["slug_headline"],
-                    summary=entry["summary"],
-                    body_text=entry["body_text"],
-                    image=entry["image"],
-                    pub_date=pub_date,
-                    number_of_comments=entry["number_of_comments"],
-                    number_of_pingbacks=entry["number_of_pingbacks"],
-                    rating=entry["rating"] if entry["rating"] is not None else 0.0)
-
-        check_obj_for_write_to_db(obj)
-        obj.authors.set(author)  # Запись отношение многое ко многому немного специфичная
-        # необходимо сначала сохранить в БД, а затем установить значения отношений
-        obj.tags.set(tag)
-
-    result_time = time() - t_start
-    print(
-        f"Записи в таблицу Entry созданы, всего {len(data_entry)} записей. Время "
-        f"выполнения: {result_time:.4f} c")
-
-    ## ______ Работа с объектами таблицы Comment _______________________________
-    t_start = time()
-    for comment in data_comment:
-        entry = Entry.objects.get(headline=comment["entry"])
-        user = User.objects.get(id=comment["user_id"])
-        parent_id = comment.get("parent_id")
-        Comment.objects.create(user=user, entry=entry, text=comment["text"],
-                               parent=Comment.objects.get(
-                                   id=parent_id) if parent_id else None)
+        f"Записи в таблицы Tag ({len(data_tag)}), Entry ({len(data_entry)}), Comment "
+        f"({len(data_comment)}) созданы. Время выполнения: {result_time:.4f} c")
 
-    result_time = time() - t_start
-    print(
-        f"Записи в таблицу Comment созданы, всего {len(data_comment)} записей. Время "
-        f"выполнения: {result_time:.4f} c")
\ No newline at end of file
+    # Уменьшенные копии картинок создаются в фоновом потоке, который завершится вместе со скриптом
+    wait_renditions()
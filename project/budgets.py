@@ -0,0 +1,100 @@
+"""
+Бюджеты производительности страниц и API для регрессионных тестов.
+
+Для каждого имени URL задаются:
+    queries - максимальное число запросов к БД при пустом кеше. Число не должно
+      зависеть от объёма данных, поэтому проверка идёт на большом наборе
+      данных: появившаяся N+1 проблема сразу выходит за бюджет;
+    p95_ms - 95-й перцентиль времени ответа (мс) при пустом кеше.
+
+Бюджет задаётся с запасом относительно текущих значений. Если изменение
+осознанно добавляет запрос - бюджет меняется в этом же коммите.
+
+Переменные окружения (.env или CI):
+    PERF_BUDGET_REPEAT - число замеров времени на URL (по умолчанию 20);
+    PERF_LATENCY_FACTOR - множитель бюджетов времени для медленных машин (по умолчанию 1);
+    PERF_SKIP_LATENCY=true - проверять только число запросов.
+"""
+
+import math
+import os
+from time import perf_counter
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class Budget(NamedTuple):
+    queries: int
+    p95_ms: float
+
+
+BUDGETS = {
+    # apps.app
+    'app:index': Budget(queries=8, p95_ms=60),
+    'app:blog': Budget(queries=7, p95_ms=60),
+    'app:post-detail': Budget(queries=9, p95_ms=400),
+    'app:about': Budget(queries=0, p95_ms=10),
+    'app:personal-account': Budget(queries=12, p95_ms=500),
+    'app:entry': Budget(queries=4, p95_ms=15),
+    'app:entry-post': Budget(queries=3, p95_ms=30),
+    # apps.api
+    'author-list': Budget(queries=1, p95_ms=60),
+    'author-detail': Budget(queries=1, p95_ms=15),
+    'author-generic-list': Budget(queries=1, p95_ms=60),
+    'author-generic-detail': Budget(queries=1, p95_ms=15),
+    'authors-viewset-list': Budget(queries=2, p95_ms=15),
+    'authors-viewset-detail': Budget(queries=1, p95_ms=15),
+    # apps.db_train
+    'train:index': Budget(queries=8, p95_ms=300),
+}
+
+REPEAT = int(os.getenv('PERF_BUDGET_REPEAT', 20))
+LATENCY_FACTOR = float(os.getenv('PERF_LATENCY_FACTOR', 1))
+SKIP_LATENCY = os.getenv('PERF_SKIP_LATENCY') == 'true'
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга"""
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+class BudgetTestMixin:
+    """
+    Проверка бюджета URL в TestCase:
+        self.assertWithinBudget('app:blog', kwargs={'name': 'travel'})
+    Запросы выполняются через self.client (для DRF - APIClient c force_authenticate).
+    """
+
+    def get_with_empty_cache(self, url, data=None):
+        cache.clear()
+        return self.client.get(url, data)
+
+    def assertWithinBudget(self, name, args=None, kwargs=None, data=None, repeat=REPEAT):
+        budget = BUDGETS[name]
+        url = reverse(name, args=args, kwargs=kwargs)
+        self.get_with_empty_cache(url, data)  # Прогрев: импорт модулей, компиляция шаблонов
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_with_empty_cache(url, data)
+        self.assertEqual(response.status_code, 200, f"{name}: {url}")
+        self.assertLessEqual(
+            len(queries), budget.queries,
+            f"{name}: {len(queries)} запросов при бюджете {budget.queries}:\n" +
+            "\n".join(query["sql"] for query in queries.captured_queries))
+
+        if SKIP_LATENCY:
+            return
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            start = perf_counter()
+            self.client.get(url, data)
+            timings.append((perf_counter() - start) * 1000)
+        p95 = percentile(timings, 95)
+        limit = budget.p95_ms * LATENCY_FACTOR
+        self.assertLessEqual(p95, limit, f"{name}: p95 {p95:.1f} мс при бюджете {limit:.0f} мс")
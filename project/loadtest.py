@@ -0,0 +1,271 @@
+"""
+Нагрузочное тестирование по карте URL проекта (python manage.py loadtest).
+
+Сценарии читаются из файла JSON Lines (как requests.jsonl): одна строка -
+один вид запроса, например
+
+    {"name": "app:post-detail", "kwargs": {"slug": "@app.Entry.slug_headline"}, "weight": 20}
+    {"name": "app:post-detail", "method": "POST", "kwargs": {"slug": "@app.Entry.slug_headline"},
+     "data": {"text": "Комментарий"}, "user": "@app.AuthorProfile.user__username", "weight": 5}
+
+Поля строки:
+    name - имя URL (reverse), по нему же группируется отчёт; вместо него можно
+      указать path (тогда label - имя в отчёте);
+    method - GET (по умолчанию), POST, PUT, PATCH, DELETE;
+    kwargs - аргументы URL, query - параметры строки запроса, data - тело
+      формы (application/x-www-form-urlencoded);
+    user - имя пользователя, от которого идёт запрос (сессия создаётся заранее);
+    weight - доля запросов этого вида (по умолчанию 1).
+Значение вида "@app.Model.field" заменяется случайным значением поля из БД
+(одно из первых SAMPLE_SIZE по pk), так запросы расходятся по разным статьям.
+
+План запросов (последовательность видов и значений) строится заранее из seed,
+поэтому прогоны воспроизводимы. Запросы выполняются concurrency асинхронными
+воркерами одним из способов:
+    HttpTransport - HTTP/1.1 поверх asyncio.open_connection к запущенному серверу
+      (python manage.py runserver), без внешних библиотек;
+    WsgiTransport - WSGI-приложение проекта в текущем процессе, в пуле потоков
+      (через все middleware, как при реальном запросе).
+"""
+
+import asyncio
+import json
+import random
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from time import perf_counter
+from typing import NamedTuple
+from urllib.parse import urlencode, unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .budgets import percentile
+
+SAMPLE_SIZE = 1000  # Сколько значений поля берётся из БД для подстановки "@app.Model.field"
+CSRF_ALLOWED_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+class Scenario(NamedTuple):
+    label: str
+    method: str
+    name: str
+    path: str
+    kwargs: dict
+    query: dict
+    data: dict
+    user: str
+    weight: float
+
+
+class PlannedRequest(NamedTuple):
+    label: str
+    method: str
+    path: str
+    body: bytes
+    user: str
+
+
+def read_scenarios(path):
+    """Сценарии из файла JSON Lines, пустые строки и строки с # пропускаются"""
+    scenarios = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}") from None
+            if not item.get("name") and not item.get("path"):
+                raise ValueError(f"{path}:{number}: нужно указать name или path")
+            scenarios.append(Scenario(label=item.get("label") or item.get("name") or item["path"],
+                                      method=item.get("method", "GET").upper(),
+                                      name=item.get("name", ""), path=item.get("path", ""),
+                                      kwargs=item.get("kwargs", {}), query=item.get("query", {}),
+                                      data=item.get("data", {}), user=item.get("user", ""),
+                                      weight=float(item.get("weight", 1))))
+    if not scenarios:
+        raise ValueError(f"{path}: нет сценариев")
+    return scenarios
+
+
+class Sampler:
+    """Случайные значения полей из БД для подстановки "@app.Model.field" """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.values = {}
+
+    def __call__(self, value):
+        if not isinstance(value, str) or not value.startswith("@"):
+            return value
+        if value not in self.values:
+            app_label, model_name, field = value[1:].split(".", 2)
+            model = apps.get_model(app_label, model_name)
+            self.values[value] = list(model._default_manager.order_by("pk")
+                                      .values_list(field, flat=True)[:SAMPLE_SIZE])
+            if not self.values[value]:
+                raise ValueError(f"Нет данных для подстановки {value}")
+        return self.rng.choice(self.values[value])
+
+
+def build_plan(scenarios, count, seed=42):
+    """Последовательность из count запросов с долями по weight, воспроизводимая по seed"""
+    rng = random.Random(seed)
+    sample = Sampler(rng)
+    plan = []
+    for scenario in rng.choices(scenarios, weights=[scenario.weight for scenario in scenarios], k=count):
+        path = scenario.path or reverse(scenario.name, kwargs={key: sample(value)
+                                                               for key, value in scenario.kwargs.items()})
+        query = {key: sample(value) for key, value in scenario.query.items()}
+        if query:
+            path = f"{path}?{urlencode(query)}"
+        body = urlencode({key: sample(value) for key, value in scenario.data.items()}).encode()
+        plan.append(PlannedRequest(scenario.label, scenario.method, path, body, str(sample(scenario.user) or "")))
+    return plan
+
+
+def session_cookies(usernames):
+    """Ключи сессий пользователей {username: session_key}, сессии создаются в БД напрямую, без входа через форму"""
+    cookies = {}
+    users = get_user_model()._default_manager.filter(username__in=set(usernames) - {""})
+    for user in users:
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        cookies[user.username] = session.session_key
+    missing = set(usernames) - set(cookies) - {""}
+    if missing:
+        raise ValueError(f"Нет пользователей: {', '.join(sorted(missing))}")
+    return cookies
+
+
+class HttpTransport:
+    """HTTP/1.1 к запущенному серверу, соединение на запрос (runserver не держит keep-alive)"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.host_header = parts.netloc
+
+    async def request(self, method, path, headers, body):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = [f"{method} {path} HTTP/1.1", f"Host: {self.host_header}", "Connection: close",
+                    f"Content-Length: {len(body)}"]
+            head += [f"{name}: {value}" for name, value in headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()  # Ответ читается целиком - до закрытия соединения сервером
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    def close(self):
+        pass
+
+
+class WsgiTransport:
+    """WSGI-приложение проекта в текущем процессе (пул из threads потоков)"""
+
+    def __init__(self, threads, host):
+        self.application = get_wsgi_application()
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.host = host
+
+    def call(self, method, path, headers, body):
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method, "PATH_INFO": unquote(path), "QUERY_STRING": query,
+            "SCRIPT_NAME": "", "SERVER_NAME": self.host, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": self.host, "CONTENT_LENGTH": str(len(body)), "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": "http", "wsgi.errors": StringIO(), "wsgi.version": (1, 0),
+            "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            environ[key if key == "CONTENT_TYPE" else f"HTTP_{key}"] = value
+        status = []
+        response = self.application(environ, lambda status_line, response_headers: status.append(status_line))
+        try:
+            for _ in response:  # Тело ответа формируется при итерации (потоковые ответы)
+                pass
+        finally:
+            response.close()
+        return int(status[0].split()[0])
+
+    async def request(self, method, path, headers, body):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.call, method, path, headers, body)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class Stats:
+    """Время ответов (мс) и ошибки по label"""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.last_error = {}  # label: последняя ошибка (статус или исключение)
+        self.elapsed = 0
+
+    def report(self):
+        """Строки отчёта: число запросов, ошибки, RPS и перцентили времени ответа по label и в целом"""
+        lines = [f"{'URL':<28}{'запросов':>9}{'ошибок':>8}{'RPS':>9}{'p50, мс':>9}{'p95, мс':>9}"
+                 f"{'p99, мс':>9}{'max, мс':>9}"]
+        rows = sorted(self.timings.items()) + [("Всего", [t for ts in self.timings.values() for t in ts])]
+        for label, timings in rows:
+            errors = sum(self.errors.values()) if label == "Всего" else self.errors[label]
+            lines.append(f"{label:<28}{len(timings):>9}{errors:>8}{len(timings) / (self.elapsed or 1):>9.1f}"
+                         f"{percentile(timings, 50):>9.1f}{percentile(timings, 95):>9.1f}"
+                         f"{percentile(timings, 99):>9.1f}{max(timings):>9.1f}")
+        return lines
+
+
+async def run(plan, transport, concurrency=10, cookies=None):
+    """
+    Выполнение плана запросов concurrency воркерами. Ошибка - статус >= 400
+    или исключение при запросе. Возвращает Stats.
+    """
+    cookies = cookies or {}
+    csrf_token = get_random_string(32, CSRF_ALLOWED_CHARS)
+    stats = Stats()
+    queue = asyncio.Queue()
+    for planned in plan:
+        queue.put_nowait(planned)
+
+    async def worker():
+        while not queue.empty():
+            planned = queue.get_nowait()
+            cookie = f"{settings.CSRF_COOKIE_NAME}={csrf_token}"
+            if planned.user:
+                cookie += f"; {settings.SESSION_COOKIE_NAME}={cookies[planned.user]}"
+            headers = {"Cookie": cookie}
+            if planned.method != "GET":
+                headers.update({"X-CSRFToken": csrf_token, "Content-Type": "application/x-www-form-urlencoded"})
+            start = perf_counter()
+            try:
+                status = await transport.request(planned.method, planned.path, headers, planned.body)
+                error = f"{planned.method} {planned.path}: статус {status}" if status >= 400 else None
+            except Exception as e:
+                error = f"{planned.method} {planned.path}: {e!r}"
+            stats.timings[planned.label].append((perf_counter() - start) * 1000)
+            if error:
+                stats.errors[planned.label] += 1
+                stats.last_error[planned.label] = error
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    stats.elapsed = perf_counter() - start
+    return stats
@@ -0,0 +1,194 @@
+"""
+Профилирование запросов в рабочем режиме (без debug_toolbar).
+
+ProfilingMiddleware профилирует запрос, если:
+    - он попал в выборку: доля PROFILING_SAMPLE_RATE (0..1) запросов;
+    - или в нём передан заголовок X-Profile со значением PROFILING_TOKEN.
+Если оба параметра не заданы, middleware отключается при запуске
+(MiddlewareNotUsed) и ничего не стоит.
+
+Для профилируемого запроса замеряются:
+    - число и время SQL-запросов (connection.execute_wrapper на всех БД);
+    - время отрисовки шаблонов (Template.render шаблонного движка Django,
+      вложенные include не считаются повторно);
+    - время сериализации DRF (BaseSerializer.data);
+    - общее время обработки.
+Замеры возвращаются в заголовке Server-Timing (видно в DevTools браузера) и
+суммируются по имени URL (resolver_match.view_name) в памяти процесса:
+    - GET /__profiling__/ (персонал или X-Profile с токеном) - текущая сводка;
+    - если задан PROFILING_FILE, сводка раз в PROFILING_FLUSH_SECONDS
+      дописывается в файл строкой JSON (под блокировкой, как credentials.py) и
+      обнуляется - так строки файла от разных процессов можно складывать.
+"""
+
+import contextvars
+import json
+import random
+import threading
+from contextlib import ExitStack
+from functools import wraps
+from time import perf_counter, time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.core.files import locks
+from django.db import connections
+from django.http import JsonResponse
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Замеры одного запроса, время в секундах"""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        self.depth = {}  # Вложенность замеряемых вызовов по виду (template, serializer)
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += perf_counter() - start
+            self.sql_count += 1
+
+    def server_timing(self):
+        return ", ".join([
+            f'sql;dur={self.sql_time * 1000:.1f};desc="SQL ({self.sql_count})"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="Templates"',
+            f'ser;dur={self.serializer_time * 1000:.1f};desc="DRF serializers"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+def timed(kind):
+    """Декоратор: время вызова добавляется к <kind>_time профиля текущего запроса (внешний вызов)"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None or profile.depth.get(kind):
+                return func(*args, **kwargs)
+            profile.depth[kind] = 1
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.depth[kind] = 0
+                setattr(profile, f"{kind}_time", getattr(profile, f"{kind}_time") + perf_counter() - start)
+        wrapper.profiled = True
+        return wrapper
+    return decorator
+
+
+def install_instrumentation():
+    """Обёртки отрисовки шаблонов и сериализации DRF (один раз на процесс)"""
+    from django.template.backends.django import Template
+    from rest_framework.serializers import BaseSerializer
+
+    if not getattr(Template.render, "profiled", False):
+        Template.render = timed("template")(Template.render)
+    if not getattr(BaseSerializer.data.fget, "profiled", False):
+        BaseSerializer.data = property(timed("serializer")(BaseSerializer.data.fget))
+
+
+class ProfileStats:
+    """Сводка замеров по именам URL (потокобезопасная)"""
+    FIELDS = ("sql_count", "sql_time", "template_time", "serializer_time", "total_time")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time()
+        self.views = {}
+
+    def add(self, name, profile):
+        with self.lock:
+            row = self.views.setdefault(name, dict.fromkeys(("requests", "max_time") + self.FIELDS, 0))
+            row["requests"] += 1
+            row["max_time"] = max(row["max_time"], profile.total_time)
+            for field in self.FIELDS:
+                row[field] += getattr(profile, field)
+
+    def snapshot(self, reset=False):
+        """Сводка: по каждому URL число запросов, суммы и средние (мс), максимум общего времени"""
+        with self.lock:
+            views, started = self.views, self.started
+            if reset:
+                self.views, self.started = {}, time()
+        result = {}
+        for name, row in sorted(views.items()):
+            count = row["requests"]
+            result[name] = {
+                "requests": count,
+                "sql_count": row["sql_count"],
+                "avg_sql_count": round(row["sql_count"] / count, 2),
+                **{f"avg_{field}_ms": round(row[field] * 1000 / count, 2) for field in self.FIELDS[1:]},
+                "max_total_time_ms": round(row["max_time"] * 1000, 2),
+            }
+        return {"since": started, "until": time(), "views": result}
+
+
+stats = ProfileStats()
+
+
+def flush_stats(path):
+    """Дописывание сводки в файл строкой JSON и обнуление сводки"""
+    line = json.dumps(stats.snapshot(reset=True), ensure_ascii=False) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        locks.lock(f, locks.LOCK_EX)
+        try:
+            f.write(line)
+        finally:
+            locks.unlock(f)
+
+
+def has_profile_token(request):
+    return bool(settings.PROFILING_TOKEN) and request.META.get(PROFILE_HEADER) == settings.PROFILING_TOKEN
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATE and not settings.PROFILING_TOKEN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.last_flush = time()
+        install_instrumentation()
+
+    def __call__(self, request):
+        if not (has_profile_token(request) or random.random() < settings.PROFILING_SAMPLE_RATE):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            profile.total_time = perf_counter() - start
+            _current.reset(token)
+
+        match = request.resolver_match
+        stats.add(match.view_name if match else "<unresolved>", profile)
+        response["Server-Timing"] = profile.server_timing()
+        if settings.PROFILING_FILE and time() - self.last_flush >= settings.PROFILING_FLUSH_SECONDS:
+            self.last_flush = time()
+            flush_stats(settings.PROFILING_FILE)
+        return response
+
+
+def profiling_stats(request):
+    """Сводка профилирования текущего процесса (?reset=1 - с обнулением)"""
+    if not (request.user.is_staff or has_profile_token(request)):
+        raise PermissionDenied
+    return JsonResponse(stats.snapshot(reset=request.GET.get("reset") == "1"),
+                        json_dumps_params={"ensure_ascii": False, "indent": 4})
@@ -17,6 +17,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings  # Чтобы была возможность подгрузить файл с настройками
 from django.conf.urls.static import static  # Чтобы подгрузить обработчик статических файлов
+from project.profiling import profiling_stats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +27,7 @@ urlpatterns = [
     path('api_alter/', include('apps.db_train_alternative.urls')),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path('api/', include('apps.api.urls')),
+    path('__profiling__/', profiling_stats, name='profiling-stats'),  # Сводка профилирования (project/profiling.py)
 ]
 
 if settings.DEBUG: